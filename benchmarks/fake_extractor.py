@@ -0,0 +1,99 @@
+"""
+Fake yt-dlp extractor and downloader for the offline benchmarks.
+
+URLs look like ordinary YouTube watch URLs (so they pass the app's own URL
+checks) but their video IDs start with "bench" and resolve to items on a
+local MediaServer. BenchVideoDownloader is a VideoDownloader whose
+extraction and downloads go through this extractor only, bypassing the
+metadata cache, and which times its progress hook.
+"""
+import re
+import time
+from typing import Any, Dict, Optional
+import yt_dlp
+from yt_dlp.extractor.common import InfoExtractor
+from benchmarks.media_server import MediaServer
+from downloader.video_downloader import VideoDownloader
+
+ID_PREFIX = "bench"
+
+
+def bench_url(index: int) -> str:
+    """
+    Watch URL for the index-th benchmark video (an 11-character ID, like YouTube's).
+    """
+    return f"https://www.youtube.com/watch?v={ID_PREFIX}{index:06d}"
+
+
+def bench_id(url: str) -> str:
+    return re.search(r"v=([\w-]{11})", url).group(1)
+
+
+class FakeYoutubeIE(InfoExtractor):
+    _VALID_URL = r"https?://(?:www\.)?youtube\.com/watch\?v=(?P<id>" + ID_PREFIX + r"[\w-]{6})"
+
+    # Set by the benchmark before extracting
+    server: Optional[MediaServer] = None
+
+    def _real_extract(self, url: str) -> Dict[str, Any]:
+        video_id = self._match_id(url)
+        item = self.server.items.get(video_id) if self.server is not None else None
+        if item is None:
+            raise yt_dlp.utils.ExtractorError(f"{video_id} is not on the media server", expected=True)
+
+        if item.segments:
+            format_info = {
+                "format_id": "hls",
+                "url": f"{self.server.base_url}/hls/{video_id}/index.m3u8",
+                "protocol": "m3u8_native",
+            }
+        else:
+            format_info = {
+                "format_id": "progressive",
+                "url": f"{self.server.base_url}/progressive/{video_id}.mp4",
+                "filesize": item.size,
+            }
+        format_info.update({"ext": "mp4", "vcodec": "avc1", "acodec": "mp4a", "height": 720})
+        return {
+            "id": video_id,
+            "title": f"Benchmark video {video_id}",
+            "duration": 60,
+            "formats": [format_info],
+        }
+
+
+def create_ydl(options: Dict[str, Any]) -> yt_dlp.YoutubeDL:
+    """
+    YoutubeDL that knows only FakeYoutubeIE and never runs ffmpeg.
+    """
+    ydl = yt_dlp.YoutubeDL({**options, "fixup": "never"}, auto_init=False)
+    ydl.add_info_extractor(FakeYoutubeIE())
+    return ydl
+
+
+class BenchVideoDownloader(VideoDownloader):
+    """
+    VideoDownloader wired to the fake extractor, counting progress hook calls and their cost.
+    """
+
+    def __init__(self, output_dir: str):
+        super().__init__(output_dir, "video+audio", "High")
+        self.hook_calls = 0
+        self.hook_seconds = 0.0
+        self.connections = 0  # Most connections any transfer used
+
+    def _extract_info(self, url: str) -> Dict[str, Any]:
+        with create_ydl({"quiet": True, "no_warnings": True}) as ydl:
+            return ydl.sanitize_info(ydl.extract_info(url, download=False))
+
+    def _create_ydl(self, options: Dict[str, Any]) -> yt_dlp.YoutubeDL:
+        return create_ydl(options)
+
+    def _progress_hook(self, d: Dict[str, Any]) -> None:
+        started = time.perf_counter()
+        try:
+            super()._progress_hook(d)
+        finally:
+            self.hook_calls += 1
+            self.connections = max(self.connections, self._transfer_connections(d))
+            self.hook_seconds += time.perf_counter() - started
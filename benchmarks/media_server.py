@@ -0,0 +1,178 @@
+"""
+Local stand-in for a media CDN, used by the offline benchmarks.
+
+Serves synthetic progressive files (with HTTP Range support, as yt-dlp uses
+for chunked downloads) and HLS playlists whose segments are fetched as
+fragments. The payload is filler bytes; nothing is ever decoded.
+"""
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+_BLOCK = bytes(range(256)) * 256  # 64 KiB of filler, written repeatedly
+
+
+class MediaItem:
+    """
+    One synthetic video on the server.
+    """
+
+    def __init__(self, size: int, segments: int = 0, rate: Optional[float] = None):
+        """
+        :param size: Total payload size in bytes.
+        :param segments: Number of HLS segments, or 0 for a progressive file.
+        :param rate: Optional per-connection send rate in bytes per second.
+        """
+        self.size = size
+        self.segments = segments
+        self.rate = rate
+
+    @property
+    def segment_size(self) -> int:
+        return -(-self.size // self.segments)
+
+    def segment_length(self, index: int) -> int:
+        return max(0, min(self.segment_size, self.size - index * self.segment_size))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "MediaServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        match = re.fullmatch(r"/(progressive|hls)/([\w-]+)(?:\.mp4|/(index\.m3u8|seg(\d+)\.ts))", self.path)
+        item = self.server.items.get(match.group(2)) if match else None
+        if item is None:
+            self.send_error(404)
+            return
+        self.server.count_request()
+
+        if match.group(1) == "progressive":
+            self._send_range(item, item.size)
+        elif match.group(3) == "index.m3u8":
+            self._send_playlist(match.group(2), item)
+        else:
+            index = int(match.group(4))
+            if index >= item.segments:
+                self.send_error(404)
+                return
+            self._send_range(item, item.segment_length(index))
+
+    def _send_playlist(self, video_id: str, item: MediaItem) -> None:
+        lines = ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-TARGETDURATION:4", "#EXT-X-MEDIA-SEQUENCE:0"]
+        for index in range(item.segments):
+            lines += ["#EXTINF:4.0,", f"seg{index}.ts"]
+        lines.append("#EXT-X-ENDLIST")
+        body = ("\n".join(lines) + "\n").encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/vnd.apple.mpegurl")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_range(self, item: MediaItem, length: int) -> None:
+        start, end = 0, length - 1
+        range_header = self.headers.get("Range")
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", range_header or "")
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2)), end) if match.group(2) else end
+            if start > end:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{length}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{length}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        self._write_body(end - start + 1, item.rate)
+
+    def _write_body(self, remaining: int, rate: Optional[float]) -> None:
+        started = time.monotonic()
+        sent = 0
+        try:
+            while remaining > 0:
+                chunk = _BLOCK[:min(remaining, len(_BLOCK))]
+                self.wfile.write(chunk)
+                sent += len(chunk)
+                remaining -= len(chunk)
+                self.server.count_bytes(len(chunk))
+                if rate:
+                    delay = sent / rate - (time.monotonic() - started)
+                    if delay > 0:
+                        time.sleep(delay)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client cancelled; nothing more to send
+            self.close_connection = True
+
+
+class MediaServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server on 127.0.0.1 with a random free port.
+    Use as a context manager; it serves from a background thread.
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.items: Dict[str, MediaItem] = {}
+        self._stats_lock = threading.Lock()
+        self.requests_served = 0
+        self.bytes_served = 0
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def add_progressive(self, video_id: str, size: int, rate: Optional[float] = None) -> str:
+        """
+        Register a single-file video.
+        :return: Its URL.
+        """
+        self.items[video_id] = MediaItem(size, rate=rate)
+        return f"{self.base_url}/progressive/{video_id}.mp4"
+
+    def add_fragmented(self, video_id: str, size: int, segments: int, rate: Optional[float] = None) -> str:
+        """
+        Register an HLS video split into segments.
+        :return: The URL of its playlist.
+        """
+        self.items[video_id] = MediaItem(size, segments, rate)
+        return f"{self.base_url}/hls/{video_id}/index.m3u8"
+
+    def count_request(self) -> None:
+        with self._stats_lock:
+            self.requests_served += 1
+
+    def count_bytes(self, amount: int) -> None:
+        with self._stats_lock:
+            self.bytes_served += amount
+
+    def stats(self) -> Tuple[int, int]:
+        """
+        :return: Requests and payload bytes served so far.
+        """
+        with self._stats_lock:
+            return self.requests_served, self.bytes_served
+
+    def __enter__(self) -> "MediaServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,142 @@
+"""
+Cold-start benchmark for the GUI.
+
+    python -m benchmarks.startup [--import-budget-ms 400] [--first-frame-budget-ms 1500]
+
+Measures the `-X importtime` cost of importing gui.app (with a per-module
+breakdown) and the time from process start to the main window being mapped.
+Exits non-zero when a budget is exceeded or when a module that must stay
+deferred (yt-dlp, requests) is imported before the window shows.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Top-level packages that must not be imported before the first frame
+DEFERRED_MODULES = ("yt_dlp", "requests")
+
+_FIRST_FRAME_SCRIPT = """
+import sys
+import ttkbootstrap as tb
+from gui.app import VideoDownloaderApp
+
+root = tb.Window(themename="darkly")
+app = VideoDownloaderApp(root)
+
+def on_map(event):
+    if event.widget is root:
+        print("mapped", flush=True)
+        print(" ".join(sorted(m for m in sys.modules if "." not in m)), flush=True)
+        root.after(0, root.destroy)
+
+root.bind("<Map>", on_map, add="+")
+root.mainloop()
+"""
+
+
+def measure_imports(module: str = "gui.app") -> Tuple[float, List[Tuple[str, int]]]:
+    """
+    Import a module in a fresh interpreter with -X importtime.
+    :return: Total import time in milliseconds and (module, cumulative microseconds) pairs.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        errors = [line for line in completed.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(f"Importing {module} failed:\n" + "\n".join(errors))
+
+    modules = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Drop the column separator's space; the remaining indentation marks nesting
+        modules.append((name[1:].rstrip(), int(cumulative)))
+    # Top-level entries (no indentation) add up to the whole import
+    total_us = sum(us for name, us in modules if not name.startswith(" "))
+    return total_us / 1000, modules
+
+
+def measure_first_frame(timeout: float = 30.0) -> Optional[Tuple[float, List[str]]]:
+    """
+    Start the GUI in a fresh interpreter and wait for the main window to be mapped.
+    :return: Milliseconds to first frame and the top-level modules loaded by then,
+             or None when no display is available.
+    """
+    if sys.platform.startswith("linux") and not os.environ.get("DISPLAY"):
+        return None
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-c", _FIRST_FRAME_SCRIPT],
+        cwd=REPO_ROOT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    try:
+        line = process.stdout.readline()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if line.strip() != "mapped":
+            raise RuntimeError("GUI exited before its window was mapped")
+        loaded = process.stdout.readline().split()
+        process.wait(timeout)
+    finally:
+        if process.poll() is None:
+            process.kill()
+    return elapsed_ms, loaded
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--import-budget-ms", type=float, default=400.0)
+    parser.add_argument("--first-frame-budget-ms", type=float, default=1500.0)
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest modules to list")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args(argv)
+
+    import_ms, modules = measure_imports()
+    slowest = sorted(modules, key=lambda m: m[1], reverse=True)[:args.top]
+    imported = {name.strip().split(".")[0] for name, _ in modules}
+    failures = [f"{name} is imported by gui.app" for name in DEFERRED_MODULES if name in imported]
+    if import_ms > args.import_budget_ms:
+        failures.append(f"import gui.app took {import_ms:.0f} ms (budget {args.import_budget_ms:.0f} ms)")
+
+    first_frame = measure_first_frame()
+    first_frame_ms = None
+    if first_frame is not None:
+        first_frame_ms, loaded = first_frame
+        failures.extend(f"{name} is loaded before the first frame" for name in DEFERRED_MODULES if name in loaded)
+        if first_frame_ms > args.first_frame_budget_ms:
+            failures.append(
+                f"first frame took {first_frame_ms:.0f} ms (budget {args.first_frame_budget_ms:.0f} ms)"
+            )
+
+    results: Dict[str, object] = {
+        "import_ms": round(import_ms, 1),
+        "first_frame_ms": None if first_frame_ms is None else round(first_frame_ms, 1),
+        "slowest_imports_ms": [(name.strip(), round(us / 1000, 1)) for name, us in slowest],
+        "failures": failures,
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"import gui.app: {import_ms:.1f} ms")
+        for name, ms in results["slowest_imports_ms"]:
+            print(f"  {ms:8.1f} ms  {name}")
+        if first_frame_ms is None:
+            print("first frame: skipped (no display)")
+        else:
+            print(f"first frame: {first_frame_ms:.1f} ms")
+        for failure in failures:
+            print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+"""
+Offline download benchmark.
+
+    python -m benchmarks.throughput [--concurrency 1,2,4] [--jobs 8] [--size-mb 8]
+                                    [--output results.json] [--compare baseline.json]
+
+Runs DownloadManager and VideoDownloader end to end against a local
+MediaServer through a fake yt-dlp extractor, so no network access is needed.
+For progressive and fragmented (HLS) media at each concurrency level it
+measures jobs/sec, bytes/sec and the cost of the progress hook, then measures
+how long a cancel takes to be acknowledged. Results can be saved as JSON and
+compared with a run from another commit; exits non-zero on a regression.
+"""
+import argparse
+import json
+import logging
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+import yt_dlp
+from benchmarks.fake_extractor import BenchVideoDownloader, FakeYoutubeIE, bench_id, bench_url
+from benchmarks.media_server import MediaServer
+from benchmarks.startup import REPO_ROOT
+from downloader.download_manager import DownloadManager
+
+KINDS = ("progressive", "fragmented")
+SEGMENT_SIZE = 512 * 1024
+
+
+def git_commit() -> Optional[str]:
+    completed = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                               capture_output=True, text=True)
+    return completed.stdout.strip() or None
+
+
+def _drain(manager: DownloadManager, counts: Dict[str, int], timeout: float) -> None:
+    """
+    Process updates until every queued job has finished.
+    """
+    deadline = time.monotonic() + timeout
+    while manager.active_downloads or not manager.progress_queue.empty():
+        if time.monotonic() > deadline:
+            manager.stop_all_downloads()
+            raise RuntimeError(f"Jobs still running after {timeout:.0f} s")
+        manager.process_progress_updates(
+            lambda progress: counts.__setitem__("delivered", counts["delivered"] + 1),
+            lambda result: counts.__setitem__("completed", counts["completed"] + 1),
+            lambda error: counts.__setitem__("errors", counts["errors"] + 1),
+            lambda url: counts.__setitem__("cancelled", counts["cancelled"] + 1),
+        )
+        time.sleep(0.005)
+
+
+def run_throughput(server: MediaServer, kind: str, concurrency: int, jobs: int, size: int,
+                   first_index: int, timeout: float) -> Dict[str, Any]:
+    """
+    Download `jobs` videos of one kind at one concurrency level.
+    """
+    urls = [bench_url(first_index + i) for i in range(jobs)]
+    for url in urls:
+        if kind == "fragmented":
+            server.add_fragmented(bench_id(url), size, max(1, size // SEGMENT_SIZE))
+        else:
+            server.add_progressive(bench_id(url), size)
+
+    output_dir = tempfile.mkdtemp(prefix="ytdl-bench-")
+    manager = DownloadManager(max_concurrent_downloads=concurrency)
+    downloaders = [BenchVideoDownloader(output_dir) for _ in urls]
+    counts = {"delivered": 0, "completed": 0, "errors": 0, "cancelled": 0}
+    _, bytes_before = server.stats()
+    try:
+        started = time.perf_counter()
+        for downloader, url in zip(downloaders, urls):
+            manager.start_download(downloader, url, None, None)
+        _drain(manager, counts, timeout)
+        seconds = time.perf_counter() - started
+    finally:
+        manager.scheduler.shutdown()
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    _, bytes_after = server.stats()
+    hook_calls = sum(d.hook_calls for d in downloaders)
+    hook_seconds = sum(d.hook_seconds for d in downloaders)
+    return {
+        "kind": kind,
+        "concurrency": concurrency,
+        "jobs": jobs,
+        "completed": counts["completed"],
+        "errors": counts["errors"],
+        "seconds": round(seconds, 3),
+        "jobs_per_sec": round(counts["completed"] / seconds, 2),
+        "bytes_per_sec": round((bytes_after - bytes_before) / seconds),
+        "hook_events": hook_calls,
+        "hook_us_per_event": round(hook_seconds / hook_calls * 1e6, 1) if hook_calls else None,
+        "delivered_progress_events": counts["delivered"],
+        "connections": max(d.connections for d in downloaders),
+    }
+
+
+def measure_cancel_latency(server: MediaServer, samples: int, first_index: int, timeout: float) -> Dict[str, Any]:
+    """
+    Cancel a slow download once it reports progress and time until the cancel is acknowledged.
+    """
+    output_dir = tempfile.mkdtemp(prefix="ytdl-bench-")
+    manager = DownloadManager(max_concurrent_downloads=1)
+    latencies: List[float] = []
+    try:
+        for i in range(samples):
+            url = bench_url(first_index + i)
+            server.add_progressive(bench_id(url), 256 * 1024 * 1024, rate=4 * 1024 * 1024)
+            manager.start_download(BenchVideoDownloader(output_dir), url, None, None)
+
+            state = {"progress": False, "cancelled_at": None}
+            deadline = time.monotonic() + timeout
+            while state["cancelled_at"] is None:
+                if time.monotonic() > deadline:
+                    raise RuntimeError("Cancelled download was never acknowledged")
+                manager.process_progress_updates(
+                    lambda progress: state.__setitem__("progress", True),
+                    lambda result: None,
+                    lambda error: None,
+                    lambda cancelled: state.__setitem__("cancelled_at", time.perf_counter()),
+                )
+                if state["progress"] and "requested_at" not in state:
+                    state["requested_at"] = time.perf_counter()
+                    manager.cancel_download(url)
+                time.sleep(0.001)
+            latencies.append((state["cancelled_at"] - state["requested_at"]) * 1000)
+    finally:
+        manager.scheduler.shutdown()
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    return {
+        "samples": len(latencies),
+        "median_ms": round(statistics.median(latencies), 1),
+        "max_ms": round(max(latencies), 1),
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    List the regressions of results against a baseline run.
+    :param tolerance: Allowed relative slowdown, e.g. 0.2 for 20%.
+    """
+    failures = []
+    previous = {(run["kind"], run["concurrency"]): run for run in baseline.get("runs", [])}
+    for run in results["runs"]:
+        before = previous.get((run["kind"], run["concurrency"]))
+        if before is None:
+            continue
+        label = f"{run['kind']} x{run['concurrency']}"
+        for metric in ("jobs_per_sec", "bytes_per_sec"):
+            if run[metric] < before[metric] * (1 - tolerance):
+                failures.append(f"{label}: {metric} fell from {before[metric]} to {run[metric]}")
+        if before.get("hook_us_per_event") and run["hook_us_per_event"] \
+                and run["hook_us_per_event"] > before["hook_us_per_event"] * (1 + tolerance):
+            failures.append(f"{label}: progress hook rose from {before['hook_us_per_event']} "
+                            f"to {run['hook_us_per_event']} us/event")
+
+    before = (baseline.get("cancel_latency") or {}).get("median_ms")
+    after = (results.get("cancel_latency") or {}).get("median_ms")
+    # Small latencies are dominated by timer noise, so allow a fixed slack as well
+    if before is not None and after is not None and after > before * (1 + tolerance) + 20:
+        failures.append(f"cancel latency rose from {before} ms to {after} ms")
+    return failures
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.throughput", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="1,2,4",
+                        help="Comma-separated concurrency levels (default: 1,2,4)")
+    parser.add_argument("--jobs", type=int, default=8, help="Downloads per run")
+    parser.add_argument("--size-mb", type=float, default=8.0, help="Size of each synthetic video")
+    parser.add_argument("--kind", choices=KINDS, action="append",
+                        help="Media kind to run (default: both)")
+    parser.add_argument("--cancel-samples", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds allowed per run")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed relative regression against the baseline (default: 0.2)")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args(argv)
+
+    # Per-download log lines would swamp the output and skew the timings
+    logging.getLogger().setLevel(logging.WARNING)
+    levels = [int(level) for level in args.concurrency.split(",")]
+    size = int(args.size_mb * 1024 * 1024)
+
+    runs = []
+    with MediaServer() as server:
+        FakeYoutubeIE.server = server
+        index = 0
+        for kind in args.kind or KINDS:
+            for concurrency in levels:
+                runs.append(run_throughput(server, kind, concurrency, args.jobs, size, index, args.timeout))
+                index += args.jobs
+        cancel_latency = measure_cancel_latency(server, args.cancel_samples, index, args.timeout) \
+            if args.cancel_samples > 0 else None
+
+    results: Dict[str, Any] = {
+        "commit": git_commit(),
+        "timestamp": round(time.time()),
+        "python": platform.python_version(),
+        "yt_dlp": yt_dlp.version.__version__,
+        "config": {"jobs": args.jobs, "size_bytes": size, "segment_size": SEGMENT_SIZE},
+        "runs": runs,
+        "cancel_latency": cancel_latency,
+    }
+    failures = [f"{run['kind']} x{run['concurrency']}: {run['errors']} downloads failed"
+                for run in runs if run["errors"]]
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            failures.extend(compare(results, json.load(f), args.tolerance))
+    results["failures"] = failures
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'kind':<12} {'conc':>4} {'jobs/s':>8} {'MiB/s':>8} {'hook us':>8} {'events':>7} {'conns':>5}")
+        for run in runs:
+            print(f"{run['kind']:<12} {run['concurrency']:>4} {run['jobs_per_sec']:>8.2f} "
+                  f"{run['bytes_per_sec'] / 1024 ** 2:>8.1f} {run['hook_us_per_event'] or 0:>8.1f} "
+                  f"{run['hook_events']:>7} {run['connections']:>5}")
+        if cancel_latency:
+            print(f"cancel latency: median {cancel_latency['median_ms']} ms, max {cancel_latency['max_ms']} ms")
+        for failure in failures:
+            print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
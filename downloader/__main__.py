@@ -0,0 +1,271 @@
+"""
+Headless batch mode: python -m downloader [options] [URL_FILE]
+
+Reads YouTube URLs (one per line) from a file or stdin, downloads them with
+DownloadManager and prints one JSON object per event on stdout. Never imports
+tkinter, PIL or ttkbootstrap.
+"""
+import argparse
+import asyncio
+import json
+import os
+import queue
+import sys
+import time
+from typing import Any, Dict, Iterable, List, Optional, TextIO, Tuple
+from downloader.bandwidth import parse_rate
+from downloader.daemon import DownloadDaemon
+from downloader.download_manager import DownloadManager, create_downloader
+from downloader.journal import JobJournal
+from downloader.metadata_service import MetadataService
+from downloader.library import LibraryIndex
+from downloader.retry import RetryPolicy
+from downloader.scheduler import PRIORITY_BULK
+from downloader.sync import SourceSync, SyncArchive
+from utils.logger import logger
+from utils.validator import extract_video_id
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m downloader",
+        description="Download YouTube URLs without the GUI, printing JSON-lines progress."
+    )
+    parser.add_argument("url_file", nargs="?", default="-",
+                        help="File with one URL per line, or '-' for stdin (default)")
+    parser.add_argument("-o", "--output-dir", default=".", help="Directory where files will be saved")
+    parser.add_argument("-f", "--format", default="video+audio", choices=["video+audio", "video", "audio"])
+    parser.add_argument("-q", "--quality", default="High", choices=["Low", "Medium", "High"])
+    parser.add_argument("-j", "--concurrency", type=int, default=3, help="Maximum parallel downloads")
+    parser.add_argument("--limit-rate", type=parse_rate, default=None,
+                        help="Global bandwidth cap shared by all downloads, e.g. 500K or 4M")
+    parser.add_argument("--journal", default=None,
+                        help="Job journal database; unfinished jobs in it are resumed first")
+    parser.add_argument("--library", default=None,
+                        help="Library index database (default: the one shared with the GUI)")
+    parser.add_argument("--no-library", action="store_true",
+                        help="Download every URL even if it is already in the library")
+    parser.add_argument("--rescan-library", action="store_true",
+                        help="Reconcile the library index with the files on disk before downloading")
+    parser.add_argument("--sync", action="store_true",
+                        help="Treat the URLs as channels/playlists and download only videos not seen by earlier syncs")
+    parser.add_argument("--sync-archive", default=None,
+                        help="Sync archive database (default: the one in the user data directory)")
+    parser.add_argument("--no-backfill", action="store_true",
+                        help="When a source is synced for the first time, skip the videos it already has")
+    parser.add_argument("--preview", action="store_true",
+                        help="Only fetch and print each URL's metadata, as soon as it is ready; download nothing")
+    parser.add_argument("--metadata-workers", type=int, default=8, help="Parallel metadata extractions")
+    parser.add_argument("--metadata-timeout", type=float, default=60.0,
+                        help="Seconds allowed for one metadata extraction")
+    parser.add_argument("--no-progress", action="store_true", help="Only print state changes and the summary")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="Serve Prometheus metrics on this local port while running")
+    parser.add_argument("--serve", action="store_true",
+                        help="Run as a daemon taking jobs over a local HTTP API instead of reading URLs")
+    parser.add_argument("--serve-port", type=int, default=8765, help="Port of the --serve API")
+    parser.add_argument("--retries", type=int, default=4,
+                        help="Times a download is retried after a transient error (HTTP 429/5xx, timeouts)")
+    return parser.parse_args(argv)
+
+
+def read_urls(lines: Iterable[str]) -> List[str]:
+    """
+    Collect URLs, skipping blank lines and '#' comments.
+    """
+    urls = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            urls.append(line)
+    return urls
+
+
+def emit(out: TextIO, event: str, url: str = None, **data: Any) -> None:
+    record = {"event": event, "time": round(time.time(), 3)}
+    if url is not None:
+        record["url"] = url
+    record.update(data)
+    out.write(json.dumps(record, default=str) + "\n")
+    out.flush()
+
+
+async def preview(urls: List[str], out: TextIO, workers: int, timeout: float) -> int:
+    """
+    Print each URL's metadata as it arrives, with bounded concurrency.
+    :return: The exit code; non-zero if any URL failed.
+    """
+    service = MetadataService(max_workers=workers, timeout=timeout)
+    started_at = time.monotonic()
+    failed = 0
+    try:
+        async for result in service.fetch_many(urls):
+            if result.error is not None:
+                failed += 1
+                emit(out, "error", result.url, error=result.error)
+                continue
+            metadata = result.metadata
+            emit(out, "info", result.url, id=metadata.id, title=metadata.title,
+                 duration=metadata.duration, uploader=metadata.uploader,
+                 view_count=metadata.view_count, elapsed=round(result.elapsed, 3))
+    finally:
+        service.close()
+    emit(out, "summary", urls=len(set(urls)), failed=failed, elapsed=round(time.monotonic() - started_at, 3))
+    return 1 if failed else 0
+
+
+def create_manager(
+    args: argparse.Namespace,
+    out: TextIO
+) -> Tuple[DownloadManager, Optional[JobJournal], Optional[LibraryIndex]]:
+    """
+    Build the manager and the stores it uses from the command line options.
+    """
+    journal = JobJournal(args.journal) if args.journal else None
+    library = None if args.no_library else LibraryIndex(args.library)
+    if library is not None and args.rescan_library:
+        emit(out, "rescan", **library.rescan())
+    manager = DownloadManager(args.concurrency, journal=journal, bandwidth_limit=args.limit_rate, library=library,
+                              retry_policy=RetryPolicy(max_attempts=args.retries + 1))
+    if args.metrics_port is not None:
+        manager.start_metrics_server(args.metrics_port)
+    return manager, journal, library
+
+
+def serve(args: argparse.Namespace, out: TextIO) -> int:
+    """
+    Daemon mode: keep one manager running and take jobs from the local HTTP API until interrupted.
+    """
+    os.makedirs(args.output_dir, exist_ok=True)
+    manager, journal, library = create_manager(args, out)
+    daemon = DownloadDaemon(manager, args.output_dir, port=args.serve_port, format=args.format, quality=args.quality)
+    daemon.adopt(manager.resume_interrupted_jobs())
+    host, port = daemon.server_address[:2]
+    emit(out, "listening", address=f"http://{host}:{port}")
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        emit(out, "interrupt")
+    finally:
+        manager.stop_all_downloads()
+        manager.scheduler.wait_idle(timeout=10)
+        daemon.close()
+        manager.stop_metrics_server()
+        if journal is not None:
+            journal.close()
+        if library is not None:
+            library.close()
+    return 0
+
+
+def run(args: argparse.Namespace, out: TextIO) -> int:
+    if args.serve:
+        return serve(args, out)
+    if args.url_file == "-":
+        urls = read_urls(sys.stdin)
+    else:
+        with open(args.url_file, "r", encoding="utf-8") as f:
+            urls = read_urls(f)
+    if args.preview:
+        return asyncio.run(preview(urls, out, args.metadata_workers, args.metadata_timeout))
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    archive = None
+    if args.sync:
+        archive = SyncArchive(args.sync_archive)
+        syncer = SourceSync(archive)
+        for source, found in syncer.sync(urls, backfill=not args.no_backfill).items():
+            if isinstance(found, int):
+                emit(out, "synced", source, new=found)
+            else:
+                emit(out, "error", source, error=found)
+        # Includes videos whose download failed in an earlier run
+        urls = syncer.pending_urls(urls)
+    manager, journal, library = create_manager(args, out)
+
+    started_at = time.monotonic()
+    pending = len(manager.resume_interrupted_jobs())
+    for url in urls:
+        try:
+            downloader = create_downloader(url, args.output_dir, args.format, args.quality)
+            manager.start_download(downloader, url, None, None, PRIORITY_BULK)
+            pending += 1
+        except Exception as e:
+            emit(out, "error", url, error=str(e))
+
+    counts: Dict[str, int] = {"complete": 0, "error": 0, "cancelled": 0}
+    skipped = 0
+    total_bytes = 0
+    while pending:
+        try:
+            update_type, url, data = manager.progress_queue.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        except KeyboardInterrupt:
+            emit(out, "interrupt")
+            manager.stop_all_downloads()
+            continue
+
+        if update_type == "progress":
+            if not args.no_progress:
+                emit(out, "progress", url, **data.to_dict())
+            continue
+        pending -= 1
+        counts[update_type] += 1
+        if update_type == "complete" and archive is not None:
+            archive.mark_downloaded(extract_video_id(url))
+        if update_type == "complete" and data.get("skipped"):
+            skipped += 1
+            emit(out, "skipped", url, **data)
+        elif update_type == "complete":
+            filesize = data.get("filesize")
+            if not filesize and os.path.isfile(data.get("filepath") or ""):
+                filesize = os.path.getsize(data["filepath"])
+            total_bytes += filesize or 0
+            emit(out, "complete", url, **data)
+        elif update_type == "error":
+            emit(out, "error", url, error=data)
+        else:
+            emit(out, "cancelled", url)
+
+    elapsed = time.monotonic() - started_at
+    emit(
+        out, "summary",
+        jobs=sum(counts.values()),
+        completed=counts["complete"],
+        skipped=skipped,
+        failed=counts["error"],
+        cancelled=counts["cancelled"],
+        elapsed=round(elapsed, 3),
+        bytes=total_bytes,
+        bytes_per_sec=round(total_bytes / elapsed, 1) if elapsed else 0.0,
+        jobs_per_sec=round(counts["complete"] / elapsed, 3) if elapsed else 0.0,
+        metrics=manager.metrics.snapshot()
+    )
+    manager.stop_metrics_server()
+    if journal is not None:
+        journal.close()
+    if library is not None:
+        library.close()
+    if archive is not None:
+        archive.close()
+    return 0 if not counts["error"] and not counts["cancelled"] else 1
+
+
+def main(argv: List[str] = None) -> int:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    # Keep stdout for JSON lines; yt-dlp's own console output goes to stderr
+    out = sys.stdout
+    sys.stdout = sys.stderr
+    try:
+        return run(args, out)
+    except Exception as e:
+        logger.error(f"Batch run failed: {str(e)}")
+        emit(out, "fatal", error=str(e))
+        return 2
+    finally:
+        sys.stdout = out
+
+
+if __name__ == "__main__":
+    sys.exit(main())
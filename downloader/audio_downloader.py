@@ -0,0 +1,164 @@
+from utils.logger import logger
+from typing import Dict, Any, List, Optional
+from concurrent.futures import Future
+import os
+import shutil
+import subprocess
+from downloader.video_downloader import VideoDownloader
+from downloader.disk_space import disk_admission
+from downloader.postprocess import postprocess_stage
+from downloader.progress import ProgressInfo
+
+# codec -> (ffmpeg encoder, ffmpeg muxer, file extension)
+AUDIO_CODECS = {
+    "mp3": ("libmp3lame", "mp3", "mp3"),
+    "opus": ("libopus", "opus", "opus"),
+    "aac": ("aac", "ipod", "m4a"),
+}
+
+# quality -> target bitrate
+AUDIO_BITRATES = {
+    "Low": "128k",
+    "Medium": "192k",
+    "High": "320k",
+}
+
+def transcode_audio(source_path: str, target_path: str, codec: str, bitrate: str) -> str:
+    """
+    Transcodes an audio file with ffmpeg. Runs inside a worker process.
+    :param source_path: Downloaded audio stream.
+    :param target_path: Final output file.
+    :param codec: One of AUDIO_CODECS.
+    :param bitrate: Target bitrate, e.g. "192k".
+    :return: The path of the transcoded file.
+    """
+    encoder, muxer, _ = AUDIO_CODECS[codec]
+    temp_path = f"{target_path}.part"
+    command = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        "-i", source_path,
+        "-vn", "-map_metadata", "0",
+        "-c:a", encoder, "-b:a", bitrate,
+        "-f", muxer, temp_path,
+    ]
+    try:
+        completed = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if completed.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed: {completed.stderr.decode(errors='replace').strip()}")
+        os.replace(temp_path, target_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    os.remove(source_path)
+    return target_path
+
+
+class AudioDownloader(VideoDownloader):
+    """
+    Downloads the best audio stream and transcodes it to MP3, Opus or AAC on the
+    postprocessing stage, so encoding one track overlaps with fetching the next.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        codec: str = "mp3",
+        bitrate: Optional[str] = None,
+        quality: str = "High"
+    ):
+        """
+        :param output_dir: Directory where files will be saved.
+        :param codec: Output codec (mp3, opus or aac).
+        :param bitrate: Target bitrate, e.g. "128k" or "192k"; defaults to the one of the quality.
+        :param quality: Quality of the download (Low, Medium, High), see AUDIO_BITRATES.
+        """
+        if codec not in AUDIO_CODECS:
+            raise ValueError(f"Unsupported audio codec: {codec}")
+        super().__init__(output_dir, "audio", quality)
+        self.codec = codec
+        self.bitrate = bitrate or AUDIO_BITRATES.get(quality, AUDIO_BITRATES["High"])
+
+    def _get_output_extension(self) -> str:
+        return AUDIO_CODECS[self.codec][2]
+
+    def _build_options(self, base_filename: str, ext: str) -> Dict[str, Any]:
+        options = super()._build_options(base_filename, ext)
+        # Keep the source stream apart from the transcoded file, even when extensions match
+        options["outtmpl"] = os.path.join(self.output_dir, f"{base_filename}.source.%(ext)s")
+        del options["merge_output_format"]
+        return options
+
+    def _start_transcode(self, result: Dict[str, Any]) -> Future:
+        source_path = result['filepath']
+        base_path = source_path.rsplit(".source.", 1)[0]
+        target_path = f"{base_path}.{self._get_output_extension()}"
+        if self._progress_callback is not None:
+            self._progress_callback(ProgressInfo('transcoding', os.path.basename(target_path)))
+        return postprocess_stage.submit(transcode_audio, source_path, target_path, self.codec, self.bitrate)
+
+    def _complete_postprocess(
+        self,
+        result: Dict[str, Any],
+        output: Dict[str, Any],
+        status: str = 'transcoded'
+    ) -> Dict[str, Any]:
+        logger.info(f"Transcoded to {self.codec}: {output['filepath']}")
+        result = super()._complete_postprocess(result, output, status)
+        return dict(result, format=f"{self.codec} {self.bitrate}")
+
+    def _required_space(self, plan) -> int:
+        # The source stream stays on disk until its transcoded copy is written
+        return 2 * super()._required_space(plan)
+
+    def library_format(self) -> str:
+        return f"audio/{self.codec}/{self.bitrate}"
+
+    def _download(self, url: str) -> Dict[str, Any]:
+        """
+        Downloads a video's audio and queues its transcode.
+        :return: The download result with a 'pending_postprocess' future.
+        """
+        # Fail before fetching anything rather than after the whole source is on disk
+        if shutil.which("ffmpeg") is None:
+            raise RuntimeError("ffmpeg is required for audio transcoding but was not found on PATH")
+        result = super()._download(url)
+        try:
+            return dict(result, pending_postprocess=self._start_transcode(result))
+        except Exception:
+            disk_admission.release(self._reservation)
+            raise
+
+    def download_batch(self, urls: List[str]) -> List[Dict[str, Any]]:
+        """
+        Downloads several tracks, fetching the next one while earlier ones encode.
+        :param urls: URLs of the YouTube videos.
+        :return: One result dictionary per URL, in order; failed items have status 'error'.
+        """
+        pending = []
+        for url in urls:
+            if self._stop_event.is_set():
+                break
+            existing = self._find_in_library(url)
+            if existing is not None:
+                pending.append((url, existing, None))
+                continue
+            try:
+                result = self._download(url)
+                future = self._chain_postprocess(url, result, result.pop('pending_postprocess'),
+                                                 self._reservation)
+                pending.append((url, result, future))
+            except Exception as e:
+                self.release_filename()
+                pending.append((url, {'status': 'error', 'error': str(e)}, None))
+
+        results = []
+        for url, result, future in pending:
+            if future is None:
+                results.append(result)
+                continue
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.error(f"Transcoding failed for {url}: {str(e)}")
+                results.append({'status': 'error', 'error': str(e)})
+        return results
@@ -0,0 +1,169 @@
+import re
+import threading
+import time
+from typing import Dict, Optional
+
+_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_rate(value: str) -> Optional[float]:
+    """
+    Parses a rate such as "500K", "2M" or "1.5G" (bytes per second).
+    :param value: Rate string; "0" or an empty string means unlimited.
+    :return: Bytes per second, or None for unlimited.
+    """
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMG]?)(?:i?B)?(?:/s)?\s*", value or "0", re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Invalid rate: {value}")
+    rate = float(match.group(1)) * _UNITS[match.group(2).upper()]
+    return rate or None
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket measured in bytes. Consumers that exceed the rate
+    go into debt and sleep until it is paid back.
+    """
+
+    def __init__(self, rate: Optional[float] = None, burst_seconds: float = 1.0):
+        """
+        :param rate: Bytes per second, or None for unlimited.
+        :param burst_seconds: Seconds of traffic that may be sent at once after idling.
+        """
+        self._lock = threading.Lock()
+        self._burst_seconds = burst_seconds
+        self._rate = rate
+        self._tokens = 0.0
+        self._updated = time.monotonic()
+
+    @property
+    def rate(self) -> Optional[float]:
+        return self._rate
+
+    def set_rate(self, rate: Optional[float]) -> None:
+        with self._lock:
+            self._refill(time.monotonic())
+            self._rate = rate
+
+    def reserve(self, amount: int) -> float:
+        """
+        Take amount bytes from the bucket.
+        :return: Seconds the caller must wait before sending more.
+        """
+        with self._lock:
+            if self._rate is None:
+                return 0.0
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= amount
+            return -self._tokens / self._rate if self._tokens < 0 else 0.0
+
+    def _refill(self, now: float) -> None:
+        if self._rate is not None:
+            capacity = self._rate * self._burst_seconds
+            self._tokens = min(capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+
+class JobThrottle:
+    """
+    Throttle handed to one download. Each chunk is charged to the job's own
+    bucket and to the governor's shared bucket.
+    """
+
+    def __init__(self, governor: "BandwidthGovernor", job_id: str, cap: Optional[float]):
+        self.job_id = job_id
+        self.cap = cap
+        self.bucket = TokenBucket()
+        self._governor = governor
+
+    def consume(self, amount: int, stop_event: Optional[threading.Event] = None) -> None:
+        """
+        Account for amount bytes just received, sleeping as long as the limits require.
+        :param stop_event: Cut the wait short when set.
+        """
+        if amount <= 0:
+            return
+        wait = max(self.bucket.reserve(amount), self._governor.shared_bucket.reserve(amount))
+        deadline = time.monotonic() + wait
+        while wait > 0:
+            if stop_event is not None and stop_event.is_set():
+                return
+            time.sleep(min(wait, 0.25))
+            wait = deadline - time.monotonic()
+
+    def release(self) -> None:
+        self._governor.unregister(self)
+
+
+class BandwidthGovernor:
+    """
+    Shares one global bandwidth cap between all running downloads.
+    Each job gets an equal share (or its own lower cap), recomputed as jobs
+    start and finish, and a slice of the cap is kept free for metadata and
+    thumbnail requests.
+    """
+
+    def __init__(self, global_rate: Optional[float] = None, reserved_rate: float = 0.0):
+        """
+        :param global_rate: Bytes per second for all traffic, or None for unlimited.
+        :param reserved_rate: Bytes per second kept free for metadata and thumbnails.
+        """
+        self._lock = threading.Lock()
+        self._global_rate = global_rate
+        self._reserved_rate = reserved_rate
+        self._jobs: Dict[str, JobThrottle] = {}
+        self.shared_bucket = TokenBucket(self._download_rate())
+
+    @property
+    def global_rate(self) -> Optional[float]:
+        return self._global_rate
+
+    def set_global_rate(self, global_rate: Optional[float], reserved_rate: Optional[float] = None) -> None:
+        """
+        Change the cap while downloads are running.
+        """
+        with self._lock:
+            self._global_rate = global_rate
+            if reserved_rate is not None:
+                self._reserved_rate = reserved_rate
+            self.shared_bucket.set_rate(self._download_rate())
+            self._rebalance()
+
+    def register(self, job_id: str, cap: Optional[float] = None) -> JobThrottle:
+        """
+        Add a running download.
+        :param cap: Optional per-job limit in bytes per second.
+        """
+        throttle = JobThrottle(self, job_id, cap)
+        with self._lock:
+            self._jobs[job_id] = throttle
+            self._rebalance()
+        return throttle
+
+    def unregister(self, throttle: JobThrottle) -> None:
+        with self._lock:
+            if self._jobs.get(throttle.job_id) is throttle:
+                del self._jobs[throttle.job_id]
+                self._rebalance()
+
+    def snapshot(self) -> Dict[str, Optional[float]]:
+        """
+        Current per-job rates, for display.
+        """
+        with self._lock:
+            return {job_id: throttle.bucket.rate for job_id, throttle in self._jobs.items()}
+
+    def _download_rate(self) -> Optional[float]:
+        if self._global_rate is None:
+            return None
+        # Never starve downloads completely, even with a large reservation
+        return max(self._global_rate - self._reserved_rate, self._global_rate * 0.1)
+
+    def _rebalance(self) -> None:
+        # Called with the lock held
+        download_rate = self._download_rate()
+        share = download_rate / len(self._jobs) if download_rate is not None and self._jobs else None
+        for throttle in self._jobs.values():
+            limits = [rate for rate in (share, throttle.cap) if rate is not None]
+            throttle.bucket.set_rate(min(limits) if limits else None)
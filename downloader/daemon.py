@@ -0,0 +1,399 @@
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+from downloader.download_manager import DownloadJob, DownloadManager, create_downloader
+from downloader.scheduler import PRIORITY_BULK, PRIORITY_INTERACTIVE
+from utils.logger import logger
+from utils.validator import extract_video_id, is_playlist_url
+
+# Job states reported by the API
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+_FINAL_STATES = {
+    'complete': JOB_COMPLETED,
+    'error': JOB_FAILED,
+    'cancelled': JOB_CANCELLED,
+}
+_PRIORITIES = {"interactive": PRIORITY_INTERACTIVE, "bulk": PRIORITY_BULK}
+_FORMATS = ("video+audio", "video", "audio")
+_QUALITIES = ("Low", "Medium", "High")
+
+
+class JobBoard:
+    """
+    State of every job submitted to the daemon, kept current by watching each
+    manager job handle, and fanned out as events to any number of subscribers.
+    """
+
+    def __init__(self, manager: DownloadManager, keep_finished: int = 1000, subscriber_backlog: int = 1000):
+        """
+        :param manager: The manager whose progress queue this board owns.
+        :param keep_finished: Finished jobs remembered for GET /jobs.
+        :param subscriber_backlog: Events buffered per subscriber before it is dropped as too slow.
+        """
+        self.manager = manager
+        self.keep_finished = keep_finished
+        self.subscriber_backlog = subscriber_backlog
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._jobs: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        # Manager handle -> ID of the record tracking it, while the job is queued or running
+        self._active: Dict[DownloadJob, int] = {}
+        self._subscribers: List[queue.Queue] = []
+        self._running = True
+        self._thread = threading.Thread(target=self._pump, name="job-board", daemon=True)
+        self._thread.start()
+
+    def register(self, handle: DownloadJob, url: str, **details: Any) -> Dict[str, Any]:
+        """
+        Track a job the manager has just queued.
+        :param handle: What start_download returned. The manager hands out the same handle
+                       for identical submissions; those get the existing record, marked duplicate.
+        """
+        now = time.time()
+        with self._lock:
+            job_id = self._active.get(handle)
+            if job_id is not None:
+                return dict(self._jobs[job_id], duplicate=True)
+            job_id = next(self._ids)
+            record = dict(details, id=job_id, url=url, state=JOB_QUEUED, progress=None,
+                          result=None, error=None, submitted_at=now, updated_at=now)
+            self._jobs[job_id] = record
+            self._active[handle] = job_id
+        self._broadcast({'event': 'queued', 'job': job_id, 'url': url})
+        self.manager.watch(handle, lambda update_type, data: self._apply(job_id, handle, update_type, data))
+        return dict(record)
+
+    def handle(self, job_id: int) -> Optional[DownloadJob]:
+        """
+        The manager handle of a job that is still queued or running.
+        """
+        with self._lock:
+            for handle, active_id in self._active.items():
+                if active_id == job_id:
+                    return handle
+            return None
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._jobs.get(job_id)
+            return dict(record) if record is not None else None
+
+    def list(self, state: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(record) for record in self._jobs.values() if state is None or record['state'] == state]
+
+    def subscribe(self) -> queue.Queue:
+        """
+        Receive every event from now on. Call unsubscribe() when done.
+        """
+        events: queue.Queue = queue.Queue(self.subscriber_backlog)
+        with self._lock:
+            self._subscribers.append(events)
+        return events
+
+    def unsubscribe(self, events: queue.Queue) -> None:
+        with self._lock:
+            if events in self._subscribers:
+                self._subscribers.remove(events)
+
+    def close(self) -> None:
+        self._running = False
+        self._thread.join(timeout=2)
+
+    def _broadcast(self, event: Dict[str, Any]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for events in subscribers:
+            try:
+                events.put_nowait(event)
+            except queue.Full:
+                # A client that stopped reading must not hold up everyone else
+                logger.warning("Dropping a slow event subscriber")
+                self.unsubscribe(events)
+                self._close_stream(events)
+
+    @staticmethod
+    def _close_stream(events: queue.Queue) -> None:
+        # Make room for the end-of-stream marker without ever blocking on the client
+        try:
+            while True:
+                events.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            events.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def _pump(self) -> None:
+        # Updates arrive through watch(); nobody else reads the manager's queue in
+        # daemon mode, so drain it to keep it from growing
+        while self._running:
+            try:
+                self.manager.progress_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            self.manager.progress_queue.task_done()
+
+    def _apply(self, job_id: int, handle: DownloadJob, update_type: str, data: Any) -> None:
+        with self._lock:
+            record = self._jobs.get(job_id)
+            if record is None or self._active.get(handle) != job_id:
+                return
+            url = record['url']
+            record['updated_at'] = time.time()
+            if update_type == 'progress':
+                progress = data.to_dict()
+                record['progress'] = progress
+                if record['state'] == JOB_QUEUED and data.status not in ('retrying', 'circuit_open'):
+                    record['state'] = JOB_RUNNING
+                event = {'event': 'progress', 'job': job_id, 'url': url, **progress}
+            else:
+                record['state'] = _FINAL_STATES[update_type]
+                if update_type == 'complete':
+                    record['result'] = data
+                elif update_type == 'error':
+                    record['error'] = data
+                del self._active[handle]
+                self._forget_finished()
+                event = {'event': record['state'], 'job': job_id, 'url': url,
+                         'result': record['result'], 'error': record['error']}
+        self._broadcast(event)
+
+    def _forget_finished(self) -> None:
+        # Called with the lock held; the oldest finished jobs go first
+        finished = [job_id for job_id, record in self._jobs.items()
+                    if record['state'] in (JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED)]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
+
+
+class _DaemonHandler(BaseHTTPRequestHandler):
+    server: "DownloadDaemon"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def _send_json(self, status: int, document: Any) -> None:
+        body = json.dumps(document, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: int, message: str) -> None:
+        self._send_json(status, {'error': message})
+
+    def _job_id(self, path: str) -> Optional[int]:
+        try:
+            return int(path[len("/jobs/"):])
+        except ValueError:
+            return None
+
+    def do_GET(self) -> None:
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        path = parsed.path.rstrip("/")
+        if path == "/jobs":
+            self._send_json(200, {'jobs': self.server.board.list(query.get("state", [None])[0])})
+        elif path.startswith("/jobs/"):
+            record = self.server.board.get(self._job_id(path))
+            if record is None:
+                self._send_error(404, "No such job")
+            else:
+                self._send_json(200, record)
+        elif path == "/events":
+            job = query.get("job", [None])[0]
+            self._stream_events(int(job) if job and job.isdigit() else None)
+        elif path == "/metrics":
+            body = self.server.manager.metrics.to_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif path == "/metrics.json":
+            self._send_json(200, self.server.manager.metrics_snapshot())
+        elif path == "/health":
+            self._send_json(200, {
+                'status': 'ok',
+                'running': self.server.manager.scheduler.running_count(),
+                'queued': self.server.manager.scheduler.pending_count(),
+            })
+        else:
+            self._send_error(404, "Not found")
+
+    def do_POST(self) -> None:
+        if urlparse(self.path).path.rstrip("/") != "/jobs":
+            self._send_error(404, "Not found")
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(request, dict):
+                raise ValueError("Expected a JSON object")
+            jobs = self.server.submit(request)
+        except (ValueError, TypeError) as e:
+            self._send_error(400, str(e))
+            return
+        self._send_json(202, {'jobs': jobs})
+
+    def do_DELETE(self) -> None:
+        path = urlparse(self.path).path.rstrip("/")
+        record = self.server.board.get(self._job_id(path)) if path.startswith("/jobs/") else None
+        if record is None:
+            self._send_error(404, "No such job")
+            return
+        handle = self.server.board.handle(record['id'])
+        if handle is not None:
+            self.server.manager.cancel_download(record['url'], handle)
+        self._send_json(202, self.server.board.get(record['id']))
+
+    def _stream_events(self, job_id: Optional[int]) -> None:
+        """
+        Server-Sent Events: one 'data:' line of JSON per event, with a comment
+        line every keepalive seconds so proxies and clients notice dead peers.
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        events = self.server.board.subscribe()
+        try:
+            while not self.server.closing:
+                try:
+                    event = events.get(timeout=self.server.keepalive)
+                except queue.Empty:
+                    self.wfile.write(b": keepalive\n\n")
+                    self.wfile.flush()
+                    continue
+                if event is None:
+                    break
+                if job_id is not None and event['job'] != job_id:
+                    continue
+                payload = json.dumps(event, default=str)
+                self.wfile.write(f"event: {event['event']}\ndata: {payload}\n\n".encode())
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.server.board.unsubscribe(events)
+
+
+class DownloadDaemon(ThreadingHTTPServer):
+    """
+    Long-running local HTTP API around one DownloadManager, so several tools
+    share a single warm process and scheduler:
+
+    - POST /jobs             queue one URL ({"url": ...}) or many ({"urls": [...]}),
+                             optionally with format, quality, output_dir and priority
+    - GET /jobs[?state=...]  every known job; GET /jobs/<id> one job
+    - DELETE /jobs/<id>      cancel a job
+    - GET /events[?job=<id>] progress and state changes as Server-Sent Events
+    - GET /metrics, /metrics.json, /health
+
+    Listens on localhost only by default; anyone who can reach the port can
+    write files wherever this process may.
+    """
+    daemon_threads = True
+
+    def __init__(
+        self,
+        manager: DownloadManager,
+        output_dir: str,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        format: str = "video+audio",
+        quality: str = "High",
+        keepalive: float = 15.0
+    ):
+        """
+        :param manager: Runs the downloads; the daemon takes over its progress queue.
+        :param output_dir: Default directory for jobs that do not name one.
+        :param port: Port to listen on (0 picks a free one).
+        :param format: Default format of submitted jobs.
+        :param quality: Default quality of submitted jobs.
+        :param keepalive: Seconds between keepalive comments on idle event streams.
+        """
+        super().__init__((host, port), _DaemonHandler)
+        self.manager = manager
+        self.output_dir = output_dir
+        self.format = format
+        self.quality = quality
+        self.keepalive = keepalive
+        self.closing = False
+        self.board = JobBoard(manager)
+        self._submit_lock = threading.Lock()
+
+    def submit(self, request: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Queue the jobs described by a POST /jobs body.
+        :return: One record per URL; a URL already queued or running with the same format,
+                 quality and output directory returns its existing job.
+        :raises ValueError: If the request is malformed; nothing is queued then.
+        """
+        urls = request.get("urls") or ([request["url"]] if request.get("url") else [])
+        if not isinstance(urls, list) or not urls:
+            raise ValueError("Give a 'url' or a non-empty list of 'urls'")
+        format = request.get("format", self.format)
+        quality = request.get("quality", self.quality)
+        output_dir = request.get("output_dir") or self.output_dir
+        priority = _PRIORITIES.get(request.get("priority", "bulk"))
+        if format not in _FORMATS:
+            raise ValueError(f"format must be one of {', '.join(_FORMATS)}")
+        if quality not in _QUALITIES:
+            raise ValueError(f"quality must be one of {', '.join(_QUALITIES)}")
+        if priority is None:
+            raise ValueError(f"priority must be one of {', '.join(_PRIORITIES)}")
+        invalid = [url for url in urls
+                   if not isinstance(url, str) or not (extract_video_id(url) or is_playlist_url(url))]
+        if invalid:
+            raise ValueError(f"Not YouTube URLs: {', '.join(map(str, invalid))}")
+        os.makedirs(output_dir, exist_ok=True)
+
+        records = []
+        # Serialised so two clients posting the same job get the same record
+        with self._submit_lock:
+            for url in urls:
+                # The manager coalesces identical submissions (same video, format, quality
+                # and directory) onto the job already in flight and returns its handle
+                downloader = create_downloader(url, output_dir, format, quality)
+                handle = self.manager.start_download(downloader, url, None, None, priority)
+                records.append(self.board.register(handle, url, format=format, quality=quality,
+                                                   output_dir=output_dir))
+        logger.info(f"Daemon queued {len(records)} job(s)")
+        return records
+
+    def adopt(self, handles: List[DownloadJob]) -> None:
+        """
+        Track jobs queued on the manager directly, e.g. ones resumed from the journal.
+        """
+        for handle in handles:
+            self.board.register(handle, handle.url)
+
+    def serve_in_background(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, name="download-daemon", daemon=True)
+        thread.start()
+        return thread
+
+    def close(self) -> None:
+        self.closing = True
+        self.shutdown()
+        self.server_close()
+        self.board.close()
@@ -0,0 +1,100 @@
+import os
+import shutil
+import threading
+from typing import Callable, Dict, Optional
+from utils.logger import logger
+
+
+class InsufficientSpaceError(OSError):
+    """
+    Raised when a download can never fit on its output volume.
+    """
+
+
+class _Reservation:
+    def __init__(self, volume: int, size: int):
+        self.volume = volume
+        self.size = size
+        self.written = 0
+
+    @property
+    def outstanding(self) -> int:
+        return max(0, self.size - self.written)
+
+
+class DiskSpaceAdmission:
+    """
+    Admits downloads only while their output volume has room for every running
+    download's remaining bytes. A job that does not fit waits until others finish,
+    instead of several jobs filling the disk mid-merge and all failing.
+    """
+
+    def __init__(self, margin: int = 256 * 1024 * 1024, poll_interval: float = 2.0):
+        """
+        :param margin: Bytes always left free on each volume.
+        :param poll_interval: Seconds between free-space checks while a job waits.
+        """
+        self.margin = margin
+        self.poll_interval = poll_interval
+        self._condition = threading.Condition()
+        self._reservations: Dict[object, _Reservation] = {}
+
+    def _outstanding(self, volume: int) -> int:
+        return sum(r.outstanding for r in self._reservations.values() if r.volume == volume)
+
+    def acquire(
+        self,
+        key: object,
+        directory: str,
+        size: int,
+        stop_event: Optional[threading.Event] = None,
+        on_wait: Optional[Callable[[], None]] = None
+    ) -> None:
+        """
+        Block until size bytes fit on the volume holding directory, then reserve them.
+        :param key: Identifies the reservation for update() and release().
+        :param stop_event: Stop waiting (without reserving) when set.
+        :param on_wait: Called once if the job has to wait.
+        :raises InsufficientSpaceError: If the volume is too small even with nothing else running.
+        """
+        volume = os.stat(directory).st_dev
+        waited = False
+        with self._condition:
+            while True:
+                if stop_event is not None and stop_event.is_set():
+                    return
+                free = shutil.disk_usage(directory).free - self.margin
+                outstanding = self._outstanding(volume)
+                if size <= free - outstanding:
+                    self._reservations[key] = _Reservation(volume, size)
+                    return
+                if outstanding == 0:
+                    # Nothing else holds space on this volume, so waiting would not help
+                    raise InsufficientSpaceError(
+                        f"Not enough free space in {directory}: "
+                        f"need {size} bytes, {max(free, 0)} available"
+                    )
+                if not waited:
+                    waited = True
+                    logger.info(f"Waiting for {size} bytes of free space in {directory}")
+                    if on_wait is not None:
+                        on_wait()
+                self._condition.wait(self.poll_interval)
+
+    def update(self, key: object, written: int) -> None:
+        """
+        Record how many of the reserved bytes a download has written so far.
+        """
+        with self._condition:
+            reservation = self._reservations.get(key)
+            if reservation is not None:
+                reservation.written = written
+
+    def release(self, key: object) -> None:
+        with self._condition:
+            if self._reservations.pop(key, None) is not None:
+                self._condition.notify_all()
+
+
+# Shared by every downloader so concurrent jobs see each other's reservations
+disk_admission = DiskSpaceAdmission()
@@ -1,85 +1,603 @@
 import threading
 import queue
-from typing import Callable, Dict, Any, Optional
+import time
+from collections import deque
+from urllib.parse import urlparse
+from typing import Callable, Dict, Any, List, Optional
 from downloader.video_downloader import VideoDownloader
+from downloader.audio_downloader import AudioDownloader
+from downloader.playlist_downloader import PlaylistDownloader
+from downloader.bandwidth import BandwidthGovernor
+from downloader.metrics import MetricsRegistry, MetricsServer, THROUGHPUT_BUCKETS
+from downloader.progress import ProgressCoalescer, ProgressInfo
+from downloader.scheduler import DownloadScheduler, PRIORITY_INTERACTIVE, PRIORITY_BULK
+from downloader import journal as job_journal
+from downloader.library import LibraryIndex
+from downloader.postprocess import postprocess_stage
+from downloader.retry import HostCircuitBreaker, RetryPolicy, classify_error
 from utils.logger import logger
+from utils.validator import is_playlist_url, parse_youtube_url
+
+
+def create_downloader(url: str, output_dir: str, format: str = "video+audio", quality: str = "High"):
+    """
+    Build the downloader suited to a URL and format.
+    :return: A PlaylistDownloader, AudioDownloader or VideoDownloader.
+    """
+    if is_playlist_url(url):
+        return PlaylistDownloader(output_dir, format, quality)
+    if format == "audio":
+        return AudioDownloader(output_dir, quality=quality)
+    return VideoDownloader(output_dir, format, quality)
+
+
+def coalesce_key(url: str, downloader) -> tuple:
+    """
+    Submissions with the same key would write the same file, so they share one download:
+    the canonical video or playlist ID, output directory, format and quality.
+    """
+    ref = parse_youtube_url(url)
+    variant = downloader.library_format() if isinstance(downloader, VideoDownloader) else downloader.format
+    return (ref.key if ref is not None else url, type(downloader).__name__, downloader.output_dir,
+            variant, downloader.quality)
+
+
+class DownloadJob:
+    """
+    Handle for a single queued or running download, shared by every submission
+    of the same content (see coalesce_key).
+    """
+    def __init__(self, url: str, priority: int, key: Optional[tuple] = None):
+        self.url = url
+        self.priority = priority
+        self.key = key
+        # Every submitted URL waiting on this job, once per submission; each gets the updates
+        self.urls: List[str] = [url]
+        self.cancel_event = threading.Event()
+        self.task: Optional[Callable[[], None]] = None
+        self.journal_id: Optional[int] = None
+        self.coalesced_journal_ids: List[int] = []  # Resumed journal entries for the same content
+        self.last_progress: Optional[ProgressInfo] = None
+        self.attempts = 0
+        self.filename: Optional[str] = None  # Output filename, kept so a retry resumes the same file
+        self.retry_timer: Optional[threading.Timer] = None
+        # Called with (update_type, data) for each update of the job itself, see DownloadManager.watch
+        self.listeners: List[Callable[[str, Any], None]] = []
+        self.final_update: Optional[tuple] = None
+
+    def cancel(self) -> None:
+        """
+        Request cancellation. Returns immediately; the manager acknowledges
+        with a ('cancelled', url, None) update once the job has stopped.
+        """
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
 
 class DownloadManager:
     """
-    Manages video downloads in separate threads with progress tracking.
+    Manages video downloads on a bounded worker pool with progress tracking.
     """
-    def __init__(self):
+    def __init__(
+        self,
+        max_concurrent_downloads: int = 3,
+        journal: Optional[job_journal.JobJournal] = None,
+        progress_interval: float = 0.25,
+        bandwidth_limit: Optional[float] = None,
+        reserved_bandwidth: float = 0.0,
+        library: Optional[LibraryIndex] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[HostCircuitBreaker] = None
+    ):
+        """
+        :param max_concurrent_downloads: Maximum number of downloads running at once.
+        :param journal: Optional durable job journal used to resume jobs after a restart.
+        :param progress_interval: Minimum seconds between two progress updates of one job.
+        :param bandwidth_limit: Global cap in bytes per second shared by all downloads (None for unlimited).
+        :param reserved_bandwidth: Part of the cap kept free for metadata and thumbnail requests.
+        :param library: Optional library index; videos already in it are not downloaded again.
+        :param retry_policy: When and how often failed downloads are retried.
+        :param circuit_breaker: Holds back jobs for hosts that are throttling us.
+        """
+        self.bandwidth = BandwidthGovernor(bandwidth_limit, reserved_bandwidth)
+        self.journal = journal
+        self.library = library
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or HostCircuitBreaker()
+        self._retry_lock = threading.Lock()
+        self.progress_interval = progress_interval
         self.progress_queue = queue.Queue()
-        self.active_downloads: Dict[str, threading.Thread] = {}
-        self._stop_event = threading.Event()
+        # URL -> handle of every queued or running download
+        self.active_downloads: Dict[str, DownloadJob] = {}
+        # coalesce_key -> the job currently producing that file
+        self._jobs_by_key: Dict[tuple, DownloadJob] = {}
+        self._jobs_lock = threading.Lock()
+        self.scheduler = DownloadScheduler(max_concurrent_downloads)
+        self.metrics = self._create_metrics()
+        # Per-job metrics of the most recently finished downloads, newest last
+        self.recent_jobs: deque = deque(maxlen=100)
+        self._metrics_server: Optional[MetricsServer] = None
+
+    def _create_metrics(self) -> MetricsRegistry:
+        metrics = MetricsRegistry()
+        metrics.counter("jobs_started_total", "Download attempts that started running")
+        metrics.counter("jobs_completed_total", "Downloads that completed")
+        metrics.counter("jobs_failed_total", "Downloads that failed")
+        metrics.counter("jobs_cancelled_total", "Downloads that were cancelled")
+        metrics.counter("bytes_downloaded_total", "Bytes received by finished downloads")
+        metrics.counter("bytes_written_total", "Size of the files written by completed downloads")
+        metrics.counter("retries_total", "HTTP and fragment retries reported by yt-dlp")
+        metrics.counter("job_retries_total", "Failed downloads queued again after a transient error")
+        metrics.counter("jobs_coalesced_total", "Submissions attached to an identical download already in flight")
+        metrics.gauge("jobs_running", "Downloads currently running", self.scheduler.running_count)
+        metrics.gauge("jobs_queued", "Downloads waiting for a worker", self.scheduler.pending_count)
+        metrics.gauge("circuits_open", "Hosts whose circuit breaker is open or half-open",
+                      self.circuit_breaker.open_count)
+        metrics.histogram("extraction_seconds", "Time spent extracting video info")
+        metrics.histogram("time_to_first_byte_seconds", "Time from extraction to the first downloaded byte")
+        metrics.histogram("throughput_bytes_per_second", "Sustained download rate", THROUGHPUT_BUCKETS)
+        metrics.histogram("postprocess_seconds", "Time spent merging, fixing up and transcoding")
+        metrics.histogram("job_seconds", "Total time of finished downloads")
+        metrics.gauge("postprocess_queue_depth", "Merges and transcodes queued or running",
+                      postprocess_stage.queue_depth)
+        metrics.gauge("postprocess_busy_seconds", "Total time postprocessing workers spent on tasks",
+                      lambda: postprocess_stage.stats()['busy_seconds'])
+        metrics.gauge("postprocess_wait_seconds", "Total time tasks waited for a postprocessing worker",
+                      lambda: postprocess_stage.stats()['wait_seconds'])
+        return metrics
 
     def start_download(
         self,
         downloader: 'VideoDownloader',
         url: str,
-        progress_callback: Callable[[Dict[str, Any]], None],
-        completion_callback: Callable[[Dict[str, Any]], None]
-    ) -> None:
+        progress_callback: Callable[[ProgressInfo], None],
+        completion_callback: Callable[[Dict[str, Any]], None],
+        priority: int = PRIORITY_INTERACTIVE,
+        journal_id: Optional[int] = None,
+        rate_limit: Optional[float] = None
+    ) -> DownloadJob:
         """
-        Start a new download in a separate thread.
+        Queue a new download on the worker pool.
+        :param priority: PRIORITY_INTERACTIVE jobs run ahead of PRIORITY_BULK ones.
+        :param journal_id: Existing journal entry when resuming a job.
+        :param rate_limit: Optional cap in bytes per second for this download alone.
+        :return: A handle that can cancel this download. A submission for content that is
+                 already queued or running gets that job's handle and all of its updates.
         """
+        key = coalesce_key(url, downloader)
+        existing = self._coalesce(key, url, priority, journal_id)
+        if existing is not None:
+            return existing
+
+        job = DownloadJob(url, priority, key)
+        if self.journal is not None:
+            if journal_id is None:
+                journal_id = self.journal.add_job(url, downloader.output_dir, downloader.format, downloader.quality)
+            job.journal_id = journal_id
+        # Playlists resume item by item, so only single downloads record a filename
+        records_filename = isinstance(downloader, VideoDownloader)
+        # Download the canonical form, e.g. without a playlist or timestamp parameter
+        ref = parse_youtube_url(url)
+        download_url = ref.url if ref is not None else url
+        # youtu.be, m. and scheme-less submissions all reach the same backend, so share its circuit
+        host = urlparse(download_url).hostname or download_url
+
         def download_thread():
+            if job.cancelled:
+                self._finish(job, ('cancelled', url, None))
+                return
+            wait = self.circuit_breaker.acquire(host)
+            if wait:
+                # The host is throttling us; hold the job back without occupying a worker
+                self._publish(job, ProgressInfo('circuit_open', job.filename, extra=self.circuit_breaker.state(host)))
+                self._schedule_retry(job, wait)
+                return
+            update = None
+            deferred = False
+            retry_delay = None
+            job.attempts += 1
+            started = time.monotonic()
+            self.metrics.inc("jobs_started_total")
+            # Registered only while running, so queued jobs don't dilute the others' share
+            throttle = self.bandwidth.register(str(id(job)), rate_limit)
+            if job.journal_id is not None:
+                self.journal.set_state(job.journal_id, job_journal.STATE_DOWNLOADING)
             try:
-                # Set up progress tracking
-                def progress_handler(progress: Dict[str, Any]):
-                    if not self._stop_event.is_set():
-                        self.progress_queue.put(('progress', url, progress))
+                # Set up progress tracking; only the latest record per interval reaches the queue
+                def enqueue(progress: ProgressInfo):
+                    if not job.cancelled:
+                        self._publish(job, progress)
+
+                coalescer = ProgressCoalescer(enqueue, self.progress_interval)
+
+                def progress_handler(progress: ProgressInfo):
+                    filename = progress.filename
+                    if records_filename and filename and filename != job.filename:
+                        job.filename = filename
+                        if job.journal_id is not None:
+                            self.journal.set_filename(job.journal_id, filename)
+                    if job.journal_id is not None:
+                        if progress.status == 'downloading':
+                            self.journal.update_progress(
+                                job.journal_id, progress.downloaded_bytes, progress.total_bytes or None
+                            )
+                    coalescer.push(progress)
 
                 downloader.set_progress_callback(progress_handler)
-                downloader.set_stop_event(self._stop_event)
+                downloader.set_stop_event(job.cancel_event)
+                downloader.set_bandwidth_throttle(throttle)
+                downloader.set_library(self.library)
+                if isinstance(downloader, PlaylistDownloader):
+                    # Its items share this manager's concurrency limit
+                    downloader.set_scheduler(self.scheduler)
+                if isinstance(downloader, VideoDownloader):
+                    downloader.set_postprocess_handoff(True)
+                    if job.attempts > 1 and job.filename:
+                        # Continue from the partial file the failed attempt left behind
+                        downloader.set_target_filename(job.filename)
                 
                 # Start the download
-                result = downloader.download_video(url)
+                try:
+                    result = downloader.download_video(download_url)
+                finally:
+                    # The transfer is over; its last held-back record goes out before the outcome
+                    coalescer.flush()
+                self.circuit_breaker.record_success(host)
+                pending = result.pop('pending_postprocess', None)
+                if pending is not None:
+                    # Merging runs on the postprocessing stage; free this worker for the next transfer
+                    deferred = True
+                    pending.add_done_callback(
+                        lambda done: self._finish_postprocess(job, url, downloader, done, started)
+                    )
+                    return
                 
-                # Signal completion
-                if not self._stop_event.is_set():
-                    self.progress_queue.put(('complete', url, result))
+                # Signal completion, even if a cancel arrived after the transfer finished
+                update = ('complete', url, self._with_metrics(result, downloader))
             except Exception as e:
-                if not self._stop_event.is_set():
-                    self.progress_queue.put(('error', url, str(e)))
-                logger.error(f"Download thread error: {str(e)}")
+                if job.cancelled:
+                    # download_video has already removed this job's partial files
+                    self.circuit_breaker.release(host)
+                    update = ('cancelled', url, None)
+                else:
+                    decision = classify_error(e)
+                    if decision.transient:
+                        self.circuit_breaker.record_failure(host, decision)
+                    else:
+                        self.circuit_breaker.record_success(host)
+                    if self.retry_policy.should_retry(decision, job.attempts):
+                        retry_delay = self.retry_policy.delay(decision, job.attempts)
+                        logger.warning(f"Attempt {job.attempts} of {url} failed, retrying in "
+                                       f"{retry_delay:.1f} s: {str(e)}")
+                        self._publish(job, ProgressInfo('retrying', job.filename, extra=dict(
+                            self.circuit_breaker.state(host),
+                            attempt=job.attempts,
+                            max_attempts=self.retry_policy.max_attempts,
+                            retry_in=round(retry_delay, 1),
+                            error=str(e),
+                            throttled=decision.throttled
+                        )))
+                    else:
+                        update = ('error', url, str(e))
+                        logger.error(f"Download thread error: {str(e)}")
+                    if isinstance(downloader, VideoDownloader) and (retry_delay is None or not job.filename):
+                        # Only a retry that knows the filename resumes it; otherwise let it go
+                        downloader.release_filename()
             finally:
-                if url in self.active_downloads:
-                    del self.active_downloads[url]
+                throttle.release()
+                if retry_delay is not None:
+                    self.metrics.inc("job_retries_total")
+                    if job.journal_id is not None:
+                        self.journal.set_state(job.journal_id, job_journal.STATE_QUEUED)
+                    self._schedule_retry(job, retry_delay)
+                elif not deferred:
+                    self._record_metrics(url, downloader, update, time.monotonic() - started)
+                    self._finish(job, update)
+
+        job.task = download_thread
+        with self._jobs_lock:
+            self.active_downloads[url] = job
+            self._jobs_by_key[key] = job
+        self.scheduler.submit(download_thread, priority)
+        return job
+
+    def _coalesce(self, key: tuple, url: str, priority: int, journal_id: Optional[int]) -> Optional[DownloadJob]:
+        """
+        Attach a submission to the job already producing the same file, if there is one.
+        :return: That job, or None if a new download has to start.
+        """
+        with self._jobs_lock:
+            job = self._jobs_by_key.get(key)
+            if job is None or job.cancelled:
+                return None
+            job.urls.append(url)
+            self.active_downloads[url] = job
+            if journal_id is not None:
+                job.coalesced_journal_ids.append(journal_id)
+            last_progress = job.last_progress
+        self.metrics.inc("jobs_coalesced_total")
+        logger.info(f"{url} is already being downloaded as {job.url}; sharing that download")
+        if priority < job.priority and job.task is not None and self.scheduler.remove(job.task):
+            # Still queued; an interactive request should not wait behind the bulk queue
+            job.priority = priority
+            self.scheduler.submit(job.task, priority)
+        if last_progress is not None:
+            self.progress_queue.put(('progress', url, last_progress))
+        return job
+
+    def _publish(self, job: DownloadJob, progress: ProgressInfo) -> None:
+        """
+        Deliver a progress record to every submission of a job.
+        """
+        job.last_progress = progress
+        for url in list(job.urls):
+            self.progress_queue.put(('progress', url, progress))
+        self._notify(job, 'progress', progress)
+
+    def watch(self, job: DownloadJob, listener: Callable[[str, Any], None]) -> None:
+        """
+        Follow one job by its handle rather than by URL, e.g. when several variants
+        of the same URL are in flight. The listener is called from worker threads
+        with ('progress', ProgressInfo) and finally with ('complete', result),
+        ('error', message) or ('cancelled', None); a job that already finished
+        reports its final update straight away.
+        """
+        with self._jobs_lock:
+            final = job.final_update
+            if final is None:
+                job.listeners.append(listener)
+                last_progress = job.last_progress
+        if final is not None:
+            listener(final[0], final[2])
+        elif last_progress is not None:
+            listener('progress', last_progress)
+
+    @staticmethod
+    def _notify(job: DownloadJob, update_type: str, data: Any) -> None:
+        for listener in list(job.listeners):
+            try:
+                listener(update_type, data)
+            except Exception as e:
+                logger.error(f"Job listener for {job.url} failed: {str(e)}")
 
-        # Create and start the download thread
-        thread = threading.Thread(target=download_thread)
-        self.active_downloads[url] = thread
-        thread.start()
+    def _schedule_retry(self, job: DownloadJob, delay: float) -> None:
+        """
+        Queue a job again after delay seconds. It holds no worker while it waits.
+        """
+        def requeue():
+            with self._retry_lock:
+                if job.retry_timer is not timer:
+                    return  # Cancelled while waiting
+                job.retry_timer = None
+            self.scheduler.submit(job.task, job.priority)
+
+        timer = threading.Timer(delay, requeue)
+        timer.daemon = True
+        with self._retry_lock:
+            if job.cancelled:
+                timer = None
+            else:
+                job.retry_timer = timer
+        if timer is None:
+            self._finish(job, ('cancelled', job.url, None))
+            return
+        timer.start()
+
+    def _finish_postprocess(self, job: DownloadJob, url: str, downloader, done, started: float) -> None:
+        """
+        Complete a job whose merge or transcode was handed to the postprocessing stage.
+        """
+        try:
+            update = ('complete', url, self._with_metrics(done.result(), downloader))
+        except Exception as e:
+            update = ('error', url, str(e))
+        self._record_metrics(url, downloader, update, time.monotonic() - started)
+        self._finish(job, update)
+
+    @staticmethod
+    def _with_metrics(result: Dict[str, Any], downloader) -> Dict[str, Any]:
+        job_metrics = getattr(downloader, 'metrics', None)
+        if job_metrics is not None:
+            result['metrics'] = job_metrics.to_dict()
+        return result
+
+    _METRIC_COUNTERS = {
+        'complete': "jobs_completed_total",
+        'error': "jobs_failed_total",
+        'cancelled': "jobs_cancelled_total",
+    }
+
+    def _record_metrics(self, url: str, downloader, update: Optional[tuple], seconds: float) -> None:
+        if update is None:
+            return
+        self.metrics.observe("job_seconds", seconds)
+        # Playlists report no per-job metrics; their items are not broken out here
+        job_metrics = getattr(downloader, 'metrics', None)
+        entry = {'url': url, 'status': update[0], 'seconds': round(seconds, 3)}
+        if job_metrics is not None:
+            data = job_metrics.to_dict()
+            self.metrics.inc("bytes_downloaded_total", job_metrics.bytes_downloaded)
+            self.metrics.inc("retries_total", job_metrics.retries)
+            self.metrics.observe("extraction_seconds", job_metrics.extraction_seconds)
+            self.metrics.observe("time_to_first_byte_seconds", job_metrics.time_to_first_byte)
+            if update[0] == 'complete':
+                self.metrics.inc("bytes_written_total", job_metrics.bytes_written)
+                self.metrics.observe("throughput_bytes_per_second", job_metrics.throughput)
+                self.metrics.observe("postprocess_seconds", job_metrics.postprocess_seconds)
+            entry['metrics'] = data
+            logger.info(f"Job metrics for {url}: {data}")
+        self.recent_jobs.append(entry)
+
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        """
+        Global counters, gauges and histograms, the postprocessing stage's statistics
+        and the metrics of recently finished jobs.
+        """
+        snapshot = self.metrics.snapshot()
+        snapshot['jobs'] = list(self.recent_jobs)
+        snapshot['postprocess'] = postprocess_stage.stats()
+        return snapshot
+
+    def start_metrics_server(self, port: int = 9464, host: str = "127.0.0.1") -> MetricsServer:
+        """
+        Serve /metrics (Prometheus text format) and /metrics.json on a local port.
+        """
+        if self._metrics_server is None:
+            self._metrics_server = MetricsServer(self.metrics, self.metrics_snapshot, host, port)
+            logger.info(f"Serving metrics on http://{host}:{self._metrics_server.server_address[1]}/metrics")
+        return self._metrics_server
+
+    def stop_metrics_server(self) -> None:
+        if self._metrics_server is not None:
+            self._metrics_server.close()
+            self._metrics_server = None
+
+    _JOURNAL_STATES = {
+        'complete': job_journal.STATE_COMPLETED,
+        'error': job_journal.STATE_FAILED,
+        'cancelled': job_journal.STATE_CANCELLED,
+    }
+
+    def _finish(self, job: DownloadJob, update: Optional[tuple]) -> None:
+        with self._jobs_lock:
+            if self._jobs_by_key.get(job.key) is job:
+                del self._jobs_by_key[job.key]
+            urls = list(job.urls)
+            for url in urls:
+                if self.active_downloads.get(url) is job:
+                    del self.active_downloads[url]
+            if update is not None:
+                job.final_update = update
+        if update is None:
+            return
+        error = update[2] if update[0] == 'error' else None
+        for journal_id in [job.journal_id] + job.coalesced_journal_ids:
+            if journal_id is not None:
+                self.journal.set_state(journal_id, self._JOURNAL_STATES[update[0]], error)
+        self.metrics.inc(self._METRIC_COUNTERS[update[0]])
+        # One update per submission, each under the URL it was submitted as
+        for url in urls:
+            self.progress_queue.put((update[0], url, update[2]))
+        self._notify(job, update[0], update[2])
 
-    def process_progress_updates(self, progress_callback: Callable[[Dict[str, Any]], None], completion_callback: Callable[[Dict[str, Any]], None], error_callback: Callable[[str], None]) -> None:
+    def process_progress_updates(self, progress_callback: Callable[[ProgressInfo], None], completion_callback: Callable[[Dict[str, Any]], None], error_callback: Callable[[str], None], cancel_callback: Optional[Callable[[str], None]] = None) -> None:
         """
         Process any pending progress updates from the queue.
         Should be called periodically from the main thread.
+        Only the latest 'downloading' record of each job is delivered per call;
+        state transitions are always delivered, in order.
         """
+        latest: Dict[str, ProgressInfo] = {}
         try:
             while True:
                 update_type, url, data = self.progress_queue.get_nowait()
+                self.progress_queue.task_done()
+                if update_type == 'progress' and data.status == 'downloading':
+                    latest[url] = data
+                    continue
+                # Anything else supersedes the job's pending record
+                latest.pop(url, None)
                 if update_type == 'progress':
                     progress_callback(data)
                 elif update_type == 'complete':
                     completion_callback(data)
                 elif update_type == 'error':
                     error_callback(data)
-                self.progress_queue.task_done()
+                elif update_type == 'cancelled' and cancel_callback is not None:
+                    cancel_callback(url)
         except queue.Empty:
             pass
+        for data in latest.values():
+            progress_callback(data)
+
+    def resume_interrupted_jobs(self) -> List[DownloadJob]:
+        """
+        Re-queue the jobs a previous run left unfinished, continuing from their partial files,
+        and drop the journal's old finished jobs.
+        :return: Handles of the resumed jobs.
+        """
+        if self.journal is None:
+            return []
+        pruned = self.journal.prune()
+        if pruned:
+            logger.info(f"Pruned {pruned} finished job(s) from the journal")
+        jobs = []
+        for entry in self.journal.unfinished_jobs():
+            downloader = create_downloader(entry['url'], entry['output_dir'], entry['format'], entry['quality'])
+            if entry['filename'] and isinstance(downloader, VideoDownloader):
+                downloader.set_target_filename(entry['filename'])
+            logger.info(f"Resuming {entry['url']} from {entry['downloaded_bytes']} bytes")
+            jobs.append(self.start_download(
+                downloader, entry['url'], None, None, PRIORITY_BULK, journal_id=entry['id']
+            ))
+        return jobs
+
+    def cancel_download(self, url: str, job: Optional[DownloadJob] = None) -> bool:
+        """
+        Cancel one download without waiting for it to stop.
+        :param job: The handle start_download returned, when the URL alone is ambiguous
+                    (e.g. the same video queued in two formats).
+        :return: True if a matching download was queued or running.
+        """
+        with self._jobs_lock:
+            job = job or self.active_downloads.get(url)
+            if job is None or url not in job.urls or job.final_update is not None:
+                return False
+            detached = job.urls.count(url) if any(other != url for other in job.urls) else 0
+            if detached:
+                # Others still want this download; only this URL's submissions leave it
+                job.urls[:] = [other for other in job.urls if other != url]
+                if self.active_downloads.get(url) is job:
+                    del self.active_downloads[url]
+        if detached:
+            for _ in range(detached):
+                self.progress_queue.put(('cancelled', url, None))
+            return True
+        job.cancel()
+        with self._retry_lock:
+            timer, job.retry_timer = job.retry_timer, None
+        if timer is not None:
+            # Waiting to be retried; nothing is running
+            timer.cancel()
+            self._finish(job, ('cancelled', url, None))
+        elif job.task is not None and self.scheduler.remove(job.task):
+            # Never started, so there is nothing to clean up
+            self._finish(job, ('cancelled', url, None))
+        return True
 
     def stop_all_downloads(self) -> None:
         """
-        Stop all active downloads.
+        Cancel all active downloads without blocking the caller.
+        Each one is acknowledged through the progress queue.
         """
-        self._stop_event.set()
-        threads = list(self.active_downloads.values())  # Make a copy to avoid dict size changes
-        for thread in threads:
-            thread.join()
-        self.active_downloads.clear()
-        self._stop_event.clear()
+        for url in list(self.active_downloads):
+            self.cancel_download(url)
+
+    def pause_queue(self) -> None:
+        """
+        Stop starting queued downloads. Running downloads continue.
+        """
+        self.scheduler.pause()
+
+    def resume_queue(self) -> None:
+        """
+        Resume starting queued downloads.
+        """
+        self.scheduler.resume()
+
+    def set_bandwidth_limit(self, bandwidth_limit: Optional[float], reserved_bandwidth: Optional[float] = None) -> None:
+        """
+        Change the global bandwidth cap; running downloads adjust immediately.
+        :param bandwidth_limit: Bytes per second, or None for unlimited.
+        :param reserved_bandwidth: Optional new slice kept free for metadata and thumbnails.
+        """
+        self.bandwidth.set_global_rate(bandwidth_limit, reserved_bandwidth)
+
+    def set_max_concurrent_downloads(self, max_concurrent_downloads: int) -> None:
+        self.scheduler.set_max_workers(max_concurrent_downloads)
 
     def is_download_active(self, url: str) -> bool:
         """
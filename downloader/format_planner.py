@@ -0,0 +1,67 @@
+from typing import Any, Dict, List, NamedTuple, Optional
+from utils.logger import logger
+
+
+class FormatPlan(NamedTuple):
+    """
+    Exact formats chosen for a download, resolved before any transfer starts.
+    """
+    format_id: str                          # e.g. "137+140", passed to yt-dlp as-is
+    format_ids: List[str]                   # The individual formats that will be fetched
+    estimated_size: Optional[int] = None    # Bytes of the final file, None if unknown
+    merged: bool = False                    # Whether the formats are muxed into one file
+    ext: Optional[str] = None
+    height: Optional[int] = None
+
+
+def estimate_format_size(fmt: Dict[str, Any], duration: Optional[float]) -> Optional[int]:
+    """
+    Size of one format from its reported size, or from bitrate times duration.
+    """
+    size = fmt.get('filesize') or fmt.get('filesize_approx')
+    if size:
+        return int(size)
+    if fmt.get('tbr') and duration:
+        # tbr is in kbit/s
+        return int(fmt['tbr'] * 1000 / 8 * duration)
+    return None
+
+
+def plan_formats(info: Dict[str, Any], selector: str) -> Optional[FormatPlan]:
+    """
+    Resolve a format selector against the formats of an extracted info dictionary,
+    exactly as yt-dlp would when downloading it.
+    :param info: Info dictionary from extraction (e.g. the metadata cache).
+    :param selector: yt-dlp format selector, e.g. "bestvideo[height<=720]+bestaudio/best".
+    :return: The plan, or None when no format matches.
+    """
+    formats = info.get('formats') or []
+    if not formats:
+        return None
+
+    import yt_dlp
+    ydl = yt_dlp.YoutubeDL({"quiet": True, "no_warnings": True}, auto_init=False)
+    format_selector = ydl.build_format_selector(selector)
+    # Same context yt-dlp builds in process_video_result
+    selected = list(format_selector({
+        'formats': formats,
+        'has_merged_format': any('none' not in (f.get('acodec'), f.get('vcodec')) for f in formats),
+        'incomplete_formats': (all(f.get('vcodec') == 'none' for f in formats)
+                               or all(f.get('acodec') == 'none' for f in formats)),
+    }))
+    if not selected:
+        return None
+
+    chosen = selected[-1]
+    parts = chosen.get('requested_formats') or [chosen]
+    sizes = [estimate_format_size(part, info.get('duration')) for part in parts]
+    plan = FormatPlan(
+        chosen['format_id'],
+        [part['format_id'] for part in parts],
+        sum(sizes) if all(sizes) else None,
+        len(parts) > 1,
+        chosen.get('ext'),
+        chosen.get('height'),
+    )
+    logger.info(f"Planned format {plan.format_id} (~{plan.estimated_size or 'unknown'} bytes)")
+    return plan
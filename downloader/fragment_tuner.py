@@ -0,0 +1,128 @@
+import threading
+from typing import Dict, Optional
+from utils.logger import logger
+
+
+class RetryCountingLogger:
+    """
+    Logger object handed to yt-dlp. Forwards messages to the app logger and
+    counts the fragment/HTTP retries yt-dlp reports.
+    """
+
+    def __init__(self):
+        self.retries = 0
+
+    def debug(self, msg: str) -> None:
+        # yt-dlp sends its regular console output here too, including the downloaders'
+        # report_retry: "[download] Got error: ... Retrying fragment 3 (1/10)..."
+        if "Got error" in msg and "Retrying" in msg:
+            self.retries += 1
+        if not msg.startswith("[debug] "):
+            logger.debug(msg)
+
+    def info(self, msg: str) -> None:
+        logger.info(msg)
+
+    def warning(self, msg: str) -> None:
+        if "Retrying" in msg or "retry" in msg:
+            self.retries += 1
+        logger.warning(msg)
+
+    def error(self, msg: str) -> None:
+        logger.error(msg)
+
+
+class FragmentTuner:
+    """
+    Chooses how many fragments (DASH/HLS) or chunks a download fetches in parallel.
+    yt-dlp fixes the count when a download starts, so the tuner adapts between
+    downloads: it adds a connection while that still raises total throughput,
+    removes one when it lowers it, and halves the count when retries pile up.
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        minimum: int = 1,
+        maximum: int = 16,
+        max_error_rate: float = 0.05,
+        smoothing: float = 0.3
+    ):
+        """
+        :param initial: Connections used before anything has been measured.
+        :param minimum: Lower bound on connections.
+        :param maximum: Upper bound on connections.
+        :param max_error_rate: Retries per fragment above which the count is halved.
+        :param smoothing: Weight of the newest sample in the per-connection moving average.
+        """
+        self.initial = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.max_error_rate = max_error_rate
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+        self._current: Dict[str, int] = {}
+        # key -> connections -> moving average of bytes/sec per connection
+        self._per_connection: Dict[str, Dict[int, float]] = {}
+
+    def choose(self, key: str = "default") -> int:
+        """
+        Connections to use for the next download.
+        :param key: Groups measurements, e.g. by extractor or host.
+        """
+        with self._lock:
+            return self._current.get(key, self.initial)
+
+    def record(
+        self,
+        connections: int,
+        total_bytes: int,
+        elapsed: float,
+        retries: int = 0,
+        fragments: Optional[int] = None,
+        key: str = "default"
+    ) -> int:
+        """
+        Feed back one finished download and update the count for the next one.
+        :param connections: Connections the download used.
+        :param total_bytes: Bytes it transferred.
+        :param elapsed: Seconds it took.
+        :param retries: Retries yt-dlp reported while it ran.
+        :param fragments: Number of fragments, if it was a fragmented download.
+        :return: Connections for the next download.
+        """
+        if elapsed <= 0 or total_bytes <= 0:
+            return self.choose(key)
+
+        per_connection = total_bytes / elapsed / connections
+        with self._lock:
+            samples = self._per_connection.setdefault(key, {})
+            previous = samples.get(connections)
+            samples[connections] = per_connection if previous is None else (
+                self.smoothing * per_connection + (1 - self.smoothing) * previous
+            )
+
+            current = self._current.get(key, self.initial)
+            error_rate = retries / max(fragments or 1, 1)
+            if error_rate > self.max_error_rate:
+                current = max(self.minimum, connections // 2)
+            else:
+                fewer = samples.get(connections - 1)
+                if fewer is None or connections * samples[connections] > 1.05 * (connections - 1) * fewer:
+                    # The extra connection still added throughput; probe one more
+                    current = min(self.maximum, connections + 1)
+                elif connections * samples[connections] < (connections - 1) * fewer:
+                    current = max(self.minimum, connections - 1)
+                else:
+                    current = connections
+            self._current[key] = current
+
+        logger.info(
+            f"Fragment concurrency {connections} -> {current} "
+            f"({per_connection / 1024:.0f} KiB/s per connection, {retries} retries)"
+        )
+        return current
+
+
+# Shared by every downloader so measurements carry over between jobs
+fragment_tuner = FragmentTuner()
@@ -0,0 +1,138 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from utils.logger import logger
+from utils.paths import user_data_dir
+
+# Job states
+STATE_QUEUED = "queued"
+STATE_DOWNLOADING = "downloading"
+STATE_COMPLETED = "completed"
+STATE_FAILED = "failed"
+STATE_CANCELLED = "cancelled"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL,
+    output_dir TEXT NOT NULL,
+    format TEXT NOT NULL,
+    quality TEXT NOT NULL,
+    filename TEXT,
+    downloaded_bytes INTEGER NOT NULL DEFAULT 0,
+    total_bytes INTEGER,
+    state TEXT NOT NULL,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state);
+"""
+
+
+def default_journal_path() -> str:
+    return os.path.join(user_data_dir(), "jobs.db")
+
+
+class JobJournal:
+    """
+    Durable record of every download job, kept in SQLite (WAL mode) so that jobs
+    interrupted by a crash or restart can resume from their partial files.
+    """
+
+    def __init__(self, path: Optional[str] = None, progress_interval: float = 2.0):
+        """
+        :param path: Database file (defaults to default_journal_path()).
+        :param progress_interval: Minimum seconds between byte-offset writes for a job.
+        """
+        self.path = path or default_journal_path()
+        self.progress_interval = progress_interval
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._last_progress_write: Dict[int, float] = {}
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL keeps commits durable across crashes without an fsync per write
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def add_job(self, url: str, output_dir: str, format: str, quality: str) -> int:
+        """
+        Record a new queued job.
+        :return: The job's journal ID.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (url, output_dir, format, quality, state, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, output_dir, format, quality, STATE_QUEUED, now, now)
+            )
+            return cursor.lastrowid
+
+    def set_state(self, job_id: int, state: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, error = ?, updated_at = ? WHERE id = ?",
+                (state, error, time.time(), job_id)
+            )
+            if state not in (STATE_QUEUED, STATE_DOWNLOADING):
+                self._last_progress_write.pop(job_id, None)
+
+    def set_filename(self, job_id: int, filename: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET filename = ?, updated_at = ? WHERE id = ?",
+                (filename, time.time(), job_id)
+            )
+
+    def update_progress(self, job_id: int, downloaded_bytes: int, total_bytes: Optional[int]) -> None:
+        """
+        Record a job's byte offset, at most once per progress_interval.
+        """
+        now = time.time()
+        with self._lock:
+            if now - self._last_progress_write.get(job_id, 0) < self.progress_interval:
+                return
+            self._last_progress_write[job_id] = now
+            self._conn.execute(
+                "UPDATE jobs SET downloaded_bytes = ?, total_bytes = ?, updated_at = ? WHERE id = ?",
+                (downloaded_bytes, total_bytes, now, job_id)
+            )
+
+    def get_job(self, job_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def unfinished_jobs(self) -> List[Dict[str, Any]]:
+        """
+        Jobs that were queued or downloading when the previous process stopped.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE state IN (?, ?) ORDER BY id",
+                (STATE_QUEUED, STATE_DOWNLOADING)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def prune(self, older_than: float = 30 * 24 * 3600) -> int:
+        """
+        Delete finished jobs last updated more than older_than seconds ago.
+        :return: Number of jobs deleted.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE state IN (?, ?, ?) AND updated_at < ?",
+                (STATE_COMPLETED, STATE_FAILED, STATE_CANCELLED, time.time() - older_than)
+            )
+            return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+        logger.info("Job journal closed.")
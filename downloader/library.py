@@ -0,0 +1,176 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Union
+from utils.logger import logger
+from utils.paths import user_data_dir
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    video_id TEXT NOT NULL,
+    format TEXT NOT NULL,
+    quality TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    checksum TEXT,
+    title TEXT,
+    added_at REAL NOT NULL,
+    PRIMARY KEY (video_id, format, quality)
+) WITHOUT ROWID;
+"""
+
+_CHECKSUM_BLOCK = 1024 * 1024
+
+
+def default_library_path() -> str:
+    return os.path.join(user_data_dir(), "library.db")
+
+
+def file_checksum(path: str) -> str:
+    """
+    SHA-256 of a file, read in 1 MiB blocks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_CHECKSUM_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class LibraryIndex:
+    """
+    Persistent index of downloaded files, keyed by video ID, format and quality,
+    so a video that is already on disk is never fetched again. Kept in SQLite
+    (WAL mode) next to the job journal.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        :param path: Database file (defaults to default_library_path()).
+        """
+        self.path = path or default_library_path()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def lookup(self, video_id: str, format: str, quality: str) -> Optional[Dict[str, Any]]:
+        """
+        Find the file already downloaded for this video, format and quality.
+        Costs one primary-key lookup and one stat; entries whose file is gone
+        or has changed size are dropped.
+        :return: The entry, or None if the video has to be downloaded.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM media WHERE video_id = ? AND format = ? AND quality = ?",
+                (video_id, format, quality)
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            if os.stat(row["path"]).st_size == row["size"]:
+                return dict(row)
+        except OSError:
+            pass
+        logger.info(f"Library entry for {video_id} no longer matches {row['path']}; dropping it")
+        self.remove(video_id, format, quality)
+        return None
+
+    def add(
+        self,
+        video_id: str,
+        format: str,
+        quality: str,
+        path: str,
+        title: Optional[str] = None,
+        checksum: Union[bool, str] = True
+    ) -> None:
+        """
+        Record a finished download, replacing any earlier entry for the same key.
+        :param path: The file that was written.
+        :param checksum: True to hash the file now (it is usually still in the page cache),
+                         False to skip hashing, or a digest already computed elsewhere.
+        """
+        stat = os.stat(path)
+        digest = checksum if isinstance(checksum, str) else file_checksum(path) if checksum else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO media "
+                "(video_id, format, quality, path, size, mtime, checksum, title, added_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (video_id, format, quality, os.path.abspath(path), stat.st_size, stat.st_mtime,
+                 digest, title, time.time())
+            )
+
+    def remove(self, video_id: str, format: str, quality: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM media WHERE video_id = ? AND format = ? AND quality = ?",
+                (video_id, format, quality)
+            )
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM media").fetchone()[0]
+
+    def rescan(self, verify: bool = False) -> Dict[str, int]:
+        """
+        Reconcile the index with the files on disk: drop entries whose file is
+        gone and refresh those whose size or modification time changed. Each
+        directory is listed once instead of stat-ing every file separately;
+        directories that cannot be listed are left alone.
+        :param verify: Also recompute the checksum of every remaining file.
+        :return: Counts of 'checked', 'removed' and 'updated' entries.
+        """
+        with self._lock:
+            rows = [dict(row) for row in self._conn.execute("SELECT * FROM media").fetchall()]
+
+        by_directory: Dict[str, list] = {}
+        for row in rows:
+            by_directory.setdefault(os.path.dirname(row["path"]), []).append(row)
+
+        removed, updated = [], []
+        for directory, entries in by_directory.items():
+            try:
+                on_disk = {entry.name: entry.stat() for entry in os.scandir(directory) if entry.is_file()}
+            except OSError as e:
+                # Possibly an unmounted or offline drive; its entries are kept until it is back
+                logger.warning(f"Library rescan skipped {directory}: {str(e)}")
+                continue
+            for row in entries:
+                stat = on_disk.get(os.path.basename(row["path"]))
+                if stat is None:
+                    removed.append(row)
+                elif stat.st_size != row["size"] or stat.st_mtime != row["mtime"] or verify:
+                    checksum = file_checksum(row["path"]) if verify or row["checksum"] else None
+                    updated.append((stat.st_size, stat.st_mtime, checksum,
+                                    row["video_id"], row["format"], row["quality"]))
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "DELETE FROM media WHERE video_id = ? AND format = ? AND quality = ?",
+                [(row["video_id"], row["format"], row["quality"]) for row in removed]
+            )
+            self._conn.executemany(
+                "UPDATE media SET size = ?, mtime = ?, checksum = ? "
+                "WHERE video_id = ? AND format = ? AND quality = ?",
+                updated
+            )
+            self._conn.execute("COMMIT")
+
+        logger.info(f"Library rescan: {len(rows)} checked, {len(removed)} removed, {len(updated)} updated")
+        return {'checked': len(rows), 'removed': len(removed), 'updated': len(updated)}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+        logger.info("Library index closed.")
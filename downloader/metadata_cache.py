@@ -0,0 +1,253 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+from utils.logger import logger
+from utils.paths import user_cache_dir
+from utils.validator import extract_video_id
+from downloader.video_metadata import VideoMetadata
+
+
+_thread_state = threading.local()
+
+
+def _thread_ydl():
+    # YoutubeDL is not thread-safe, but building one per call is costly; keep one per thread
+    ydl = getattr(_thread_state, "ydl", None)
+    if ydl is None:
+        import yt_dlp
+        ydl = _thread_state.ydl = yt_dlp.YoutubeDL({"quiet": True, "no_warnings": True})
+    return ydl
+
+
+def extract_info(url: str) -> Dict[str, Any]:
+    """
+    Runs a full yt-dlp extraction without downloading anything.
+    :param url: The URL of the YouTube video.
+    :return: A JSON-serializable info dictionary.
+    """
+    ydl = _thread_ydl()
+    info = ydl.extract_info(url, download=False)
+    return ydl.sanitize_info(info)
+
+
+class MetadataCache:
+    """
+    Caches yt-dlp metadata by video ID, so a video is extracted once and reused
+    by the GUI and the downloader. Memory holds a compact VideoMetadata record
+    per video and only the last few full info dictionaries (which downloads
+    need); the full dictionaries are kept on disk.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        ttl: float = 1800,
+        max_entries: int = 4096,
+        max_disk_entries: int = 2048,
+        max_full_entries: int = 8
+    ):
+        """
+        :param cache_dir: Directory for the on-disk cache (None to keep it in memory only).
+        :param ttl: Seconds an entry stays valid. Format URLs expire, so keep this short.
+        :param max_entries: Maximum number of metadata records kept in memory.
+        :param max_disk_entries: Maximum number of entry files kept on disk.
+        :param max_full_entries: Maximum number of full info dictionaries kept in memory.
+        """
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.max_full_entries = max_full_entries
+        # key -> (fetched_at, VideoMetadata)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # key -> (fetched_at, info dictionary), for downloads about to start
+        self._full: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+
+    def _key(self, url: str) -> str:
+        return extract_video_id(url) or url
+
+    def _path(self, key: str) -> Optional[str]:
+        if not self.cache_dir or key != extract_video_id(f"youtu.be/{key}"):
+            # Only plain video IDs are safe to use as file names
+            return None
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached full info dictionary for a URL, or None if missing or expired.
+        """
+        key = self._key(url)
+        now = time.time()
+        with self._lock:
+            entry = self._full.get(key)
+            if entry is not None:
+                fetched_at, info = entry
+                if now - fetched_at < self.ttl:
+                    self._full.move_to_end(key)
+                    return info
+                del self._full[key]
+
+        data = self._read(key, now)
+        if data is None:
+            return None
+        self._remember(key, data["fetched_at"], data["info"])
+        return data["info"]
+
+    def get_metadata(self, url: str) -> Optional[VideoMetadata]:
+        """
+        Return the cached metadata record for a URL, or None if missing or expired.
+        Never keeps the full info dictionary in memory.
+        """
+        key = self._key(url)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                fetched_at, metadata = entry
+                if now - fetched_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    return metadata
+                del self._entries[key]
+
+        data = self._read(key, now)
+        if data is None:
+            return None
+        metadata = VideoMetadata.from_info(data["info"])
+        self._remember_metadata(key, data["fetched_at"], metadata)
+        return metadata
+
+    def _read(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if now - data.get("fetched_at", 0) >= self.ttl:
+            self._remove_file(path)
+            return None
+        try:
+            # Touch the file so disk eviction stays least-recently-used
+            os.utime(path, None)
+        except OSError:
+            pass
+        return data
+
+    def put(self, url: str, info: Dict[str, Any]) -> None:
+        """
+        Store an info dictionary on disk, its metadata record in memory, and the
+        dictionary itself among the few kept in memory for imminent downloads.
+        """
+        key = self._key(url)
+        fetched_at = time.time()
+        self._remember(key, fetched_at, info)
+
+        path = self._path(key)
+        if path is None:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"fetched_at": fetched_at, "info": info}, f)
+            os.replace(tmp_path, path)
+            self._evict_disk()
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Could not write metadata cache entry for {key}: {str(e)}")
+
+    def invalidate(self, url: str) -> None:
+        """
+        Drop a cached entry, e.g. after its format URLs turned out to be stale.
+        """
+        key = self._key(url)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._full.pop(key, None)
+        path = self._path(key)
+        if path is not None:
+            self._remove_file(path)
+
+    def get_or_extract(
+        self,
+        url: str,
+        extractor: Callable[[str], Dict[str, Any]] = extract_info
+    ) -> Dict[str, Any]:
+        """
+        Return the cached full info for a URL, running the extractor only on a miss.
+        Concurrent callers for the same video wait for a single extraction.
+        """
+        info = self.get(url)
+        if info is not None:
+            return info
+
+        key = self._key(url)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            info = self.get(url)
+            if info is None:
+                logger.info(f"Metadata cache miss, extracting: {url}")
+                info = extractor(url)
+                self.put(url, info)
+        with self._lock:
+            self._key_locks.pop(key, None)
+        return info
+
+    def get_or_extract_metadata(
+        self,
+        url: str,
+        extractor: Callable[[str], Dict[str, Any]] = extract_info
+    ) -> VideoMetadata:
+        """
+        Return the metadata record for a URL, extracting only on a miss.
+        """
+        metadata = self.get_metadata(url)
+        if metadata is not None:
+            return metadata
+        self.get_or_extract(url, extractor)
+        return self.get_metadata(url)
+
+    def _remember(self, key: str, fetched_at: float, info: Dict[str, Any]) -> None:
+        self._remember_metadata(key, fetched_at, VideoMetadata.from_info(info))
+        with self._lock:
+            self._full[key] = (fetched_at, info)
+            self._full.move_to_end(key)
+            while len(self._full) > self.max_full_entries:
+                self._full.popitem(last=False)
+
+    def _remember_metadata(self, key: str, fetched_at: float, metadata: VideoMetadata) -> None:
+        with self._lock:
+            self._entries[key] = (fetched_at, metadata)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _evict_disk(self) -> None:
+        try:
+            entries = [e for e in os.scandir(self.cache_dir) if e.name.endswith(".json")]
+        except OSError:
+            return
+        excess = len(entries) - self.max_disk_entries
+        if excess <= 0:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[:excess]:
+            self._remove_file(entry.path)
+
+    @staticmethod
+    def _remove_file(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+# Shared by the GUI and every downloader
+metadata_cache = MetadataCache(cache_dir=user_cache_dir("metadata"))
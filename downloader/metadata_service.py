@@ -0,0 +1,154 @@
+import asyncio
+import threading
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, NamedTuple, Optional
+from downloader.metadata_cache import MetadataCache, extract_info, metadata_cache
+from downloader.video_metadata import VideoMetadata
+from utils.logger import logger
+from utils.validator import extract_video_id
+
+
+class MetadataResult(NamedTuple):
+    """
+    Outcome of fetching one URL's metadata.
+    """
+    url: str
+    metadata: Optional[VideoMetadata] = None
+    error: Optional[str] = None
+    elapsed: float = 0.0
+
+
+class MetadataService:
+    """
+    asyncio front end to the metadata cache. Extractions run on a bounded thread
+    pool, concurrent requests for the same video share one extraction, and each
+    extraction has a timeout. Coroutines can be awaited directly, or submitted
+    from synchronous code (e.g. the Tk main thread) to the service's own loop.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 8,
+        timeout: float = 60.0,
+        cache: MetadataCache = metadata_cache,
+        extractor: Callable[[str], Dict[str, Any]] = extract_info
+    ):
+        """
+        :param max_workers: Extractions running at once.
+        :param timeout: Seconds one extraction may take once it has started.
+        :param cache: Cache consulted before extracting and filled afterwards.
+        :param extractor: Function doing the actual extraction.
+        """
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._cache = cache
+        self._extractor = extractor
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="metadata")
+        # Per event loop: video key -> task of the extraction in flight, and the slot semaphore
+        self._inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Task]]" = \
+            weakref.WeakKeyDictionary()
+        self._slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = \
+            weakref.WeakKeyDictionary()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+
+    async def fetch(self, url: str) -> VideoMetadata:
+        """
+        Get the metadata record for a URL, from cache when possible.
+        :raises asyncio.TimeoutError: If the extraction takes longer than the timeout.
+        """
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight.setdefault(loop, {})
+        key = extract_video_id(url) or url
+        task = inflight.get(key)
+        if task is None:
+            task = inflight[key] = loop.create_task(self._extract(loop, url))
+            task.add_done_callback(lambda done: inflight.pop(key, None) if inflight.get(key) is done else None)
+        # One caller giving up must not cancel the extraction the others are waiting for
+        return await asyncio.shield(task)
+
+    async def _extract(self, loop: asyncio.AbstractEventLoop, url: str) -> VideoMetadata:
+        metadata = self._cache.get_metadata(url)
+        if metadata is not None:
+            return metadata
+        slots = self._slots.get(loop)
+        if slots is None:
+            slots = self._slots[loop] = asyncio.Semaphore(self.max_workers)
+        # The timeout only starts once a worker is free, not while the request is queued
+        async with slots:
+            return await asyncio.wait_for(
+                loop.run_in_executor(self._executor, self._cache.get_or_extract_metadata, url, self._extractor),
+                self.timeout
+            )
+
+    async def fetch_many(self, urls: Iterable[str]) -> AsyncIterator[MetadataResult]:
+        """
+        Fetch many URLs concurrently, yielding each result as soon as it is ready.
+        Failures and timeouts are yielded as results with an error, never raised.
+        """
+        loop = asyncio.get_running_loop()
+
+        async def fetch_one(url: str) -> MetadataResult:
+            started = loop.time()
+            try:
+                metadata = await self.fetch(url)
+                return MetadataResult(url, metadata, None, loop.time() - started)
+            except asyncio.TimeoutError:
+                error = f"Timed out after {self.timeout:.0f} s"
+            except Exception as e:
+                error = str(e)
+            logger.warning(f"Could not fetch metadata for {url}: {error}")
+            return MetadataResult(url, None, error, loop.time() - started)
+
+        tasks = [loop.create_task(fetch_one(url)) for url in dict.fromkeys(urls)]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            # The consumer stopped early; drop the requests still waiting for a worker
+            for task in tasks:
+                task.cancel()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="metadata-loop", daemon=True).start()
+            return self._loop
+
+    def run(self, coroutine: Awaitable[Any]) -> Future:
+        """
+        Run a coroutine on the service's background loop from synchronous code.
+        :return: A concurrent.futures.Future with the coroutine's result.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self._ensure_loop())
+
+    def submit(self, url: str) -> Future:
+        """
+        Fetch one URL from synchronous code.
+        :return: A concurrent.futures.Future with the VideoMetadata record.
+        """
+        return self.run(self.fetch(url))
+
+    def preview(self, urls: Iterable[str], callback: Callable[[MetadataResult], None]) -> Future:
+        """
+        Fetch many URLs from synchronous code, calling callback (on the loop thread)
+        with each result as it completes.
+        :return: A future that completes when every URL has been handled.
+        """
+        async def consume() -> None:
+            async for result in self.fetch_many(urls):
+                callback(result)
+
+        return self.run(consume())
+
+    def close(self) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = None
+        self._executor.shutdown(wait=False)
+
+
+# Shared by the GUI and the batch preview
+metadata_service = MetadataService()
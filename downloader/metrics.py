@@ -0,0 +1,239 @@
+import bisect
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Bucket upper bounds, in the unit of each histogram
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+THROUGHPUT_BUCKETS = tuple(2 ** i * 1024 for i in range(6, 18, 2))  # 64 KiB/s .. 64 MiB/s
+
+
+class JobMetrics:
+    """
+    Timings and sizes of one download, filled in by the downloader as it runs.
+    Times come from time.monotonic() and are reported relative to the start.
+    """
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.extracted_at: Optional[float] = None
+        self.first_byte_at: Optional[float] = None
+        self.last_byte_at: Optional[float] = None
+        self.bytes_downloaded = 0
+        self.bytes_written = 0
+        self.retries = 0
+        self.postprocess_seconds = 0.0
+        self.finished_at: Optional[float] = None
+
+    def extracted(self) -> None:
+        self.extracted_at = time.monotonic()
+
+    def transferred(self) -> None:
+        """
+        Note that bytes arrived just now.
+        """
+        now = time.monotonic()
+        if self.first_byte_at is None:
+            self.first_byte_at = now
+        self.last_byte_at = now
+
+    def finished(self) -> None:
+        self.finished_at = time.monotonic()
+
+    @property
+    def extraction_seconds(self) -> Optional[float]:
+        return None if self.extracted_at is None else self.extracted_at - self.started_at
+
+    @property
+    def time_to_first_byte(self) -> Optional[float]:
+        """
+        Seconds from the end of extraction to the first downloaded byte.
+        """
+        if self.first_byte_at is None or self.extracted_at is None:
+            return None
+        return self.first_byte_at - self.extracted_at
+
+    @property
+    def throughput(self) -> Optional[float]:
+        """
+        Bytes per second sustained between the first and the last downloaded byte.
+        """
+        if self.first_byte_at is None or self.last_byte_at is None or self.last_byte_at <= self.first_byte_at:
+            return None
+        return self.bytes_downloaded / (self.last_byte_at - self.first_byte_at)
+
+    def to_dict(self) -> Dict[str, Any]:
+        def rounded(value: Optional[float], digits: int = 3) -> Optional[float]:
+            return None if value is None else round(value, digits)
+
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return {
+            'extraction_seconds': rounded(self.extraction_seconds),
+            'time_to_first_byte': rounded(self.time_to_first_byte),
+            'throughput': rounded(self.throughput, 0),
+            'retries': self.retries,
+            'postprocess_seconds': rounded(self.postprocess_seconds),
+            'bytes_downloaded': self.bytes_downloaded,
+            'bytes_written': self.bytes_written,
+            'total_seconds': rounded(end - self.started_at),
+        }
+
+
+class Histogram:
+    """
+    Cumulative histogram with fixed bucket bounds, as Prometheus expects.
+    """
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        total = 0
+        result = []
+        for bound, count in zip(list(self.buckets) + [float("inf")], self.counts):
+            total += count
+            result.append(("+Inf" if bound == float("inf") else f"{bound:g}", total))
+        return result
+
+
+class MetricsRegistry:
+    """
+    Thread-safe counters, gauges and histograms, rendered in the Prometheus
+    text format or as a JSON-serializable snapshot.
+    """
+
+    def __init__(self, prefix: str = "ytdl"):
+        """
+        :param prefix: Prepended to every metric name.
+        """
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._help: Dict[str, str] = {}
+        self._counters: Dict[str, float] = {}
+        self._histograms: Dict[str, Histogram] = {}
+        self._gauges: Dict[str, Callable[[], float]] = {}
+
+    def counter(self, name: str, help: str) -> None:
+        with self._lock:
+            self._help[name] = help
+            self._counters.setdefault(name, 0.0)
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float] = SECONDS_BUCKETS) -> None:
+        with self._lock:
+            self._help[name] = help
+            self._histograms.setdefault(name, Histogram(buckets))
+
+    def gauge(self, name: str, help: str, read: Callable[[], float]) -> None:
+        """
+        Declare a gauge whose value is read when the metrics are collected.
+        """
+        with self._lock:
+            self._help[name] = help
+            self._gauges[name] = read
+
+    def inc(self, name: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._counters[name] += amount
+
+    def observe(self, name: str, value: Optional[float]) -> None:
+        if value is None:
+            return
+        with self._lock:
+            self._histograms[name].observe(value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        gauges = {name: read() for name, read in list(self._gauges.items())}
+        with self._lock:
+            return {
+                'counters': dict(self._counters),
+                'gauges': gauges,
+                'histograms': {
+                    name: {'count': h.count, 'sum': round(h.sum, 6), 'buckets': dict(h.cumulative())}
+                    for name, h in self._histograms.items()
+                },
+            }
+
+    def to_prometheus(self) -> str:
+        snapshot = self.snapshot()
+        lines = []
+
+        def header(name: str, kind: str) -> str:
+            full = f"{self.prefix}_{name}"
+            lines.append(f"# HELP {full} {self._help.get(name, name)}")
+            lines.append(f"# TYPE {full} {kind}")
+            return full
+
+        for name, value in snapshot['counters'].items():
+            lines.append(f"{header(name, 'counter')} {_format_value(value)}")
+        for name, value in snapshot['gauges'].items():
+            lines.append(f"{header(name, 'gauge')} {_format_value(value)}")
+        for name, data in snapshot['histograms'].items():
+            full = header(name, 'histogram')
+            for bound, count in data['buckets'].items():
+                lines.append(f'{full}_bucket{{le="{bound}"}} {count}')
+            lines.append(f"{full}_sum {_format_value(data['sum'])}")
+            lines.append(f"{full}_count {data['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_value(value: float) -> str:
+    # Prometheus accepts any float, but keep large byte counts exact
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    server: "MetricsServer"
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            body = self.server.registry.to_prometheus().encode()
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/metrics.json":
+            body = json.dumps(self.server.snapshot(), default=str).encode()
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MetricsServer(ThreadingHTTPServer):
+    """
+    Optional local endpoint: /metrics in the Prometheus text format and
+    /metrics.json with the full snapshot. Serves from a daemon thread.
+    """
+    daemon_threads = True
+
+    def __init__(self, registry: MetricsRegistry, snapshot: Callable[[], Dict[str, Any]],
+                 host: str = "127.0.0.1", port: int = 9464):
+        """
+        :param registry: Metrics rendered at /metrics.
+        :param snapshot: Returns the document served at /metrics.json.
+        :param port: Port to listen on (0 picks a free one).
+        """
+        super().__init__((host, port), _MetricsHandler)
+        self.registry = registry
+        self.snapshot = snapshot
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self.shutdown()
+        self.server_close()
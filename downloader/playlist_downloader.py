@@ -0,0 +1,292 @@
+from utils.logger import logger
+from typing import Callable, Dict, Any, Iterator, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+import threading
+from downloader.video_downloader import VideoDownloader
+from downloader.audio_downloader import AudioDownloader
+from downloader.progress import ProgressInfo
+from utils.validator import is_playlist_url
+
+
+def iter_flat_entries(
+    url: str,
+    stop_event: Optional[threading.Event] = None,
+    on_playlist: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily yields the flat entries of a playlist or channel tab, page by page,
+    in the order the site lists them. Pages past the point where the caller
+    stops iterating are never requested.
+    :param url: The URL of the playlist or channel tab.
+    :param stop_event: Stop yielding when set.
+    :param on_playlist: Called with the playlist's own info once it is known.
+    """
+    options = {
+        "quiet": True,
+        "no_warnings": True,
+        "extract_flat": "in_playlist",
+        "lazy_playlist": True,
+    }
+    import yt_dlp
+    with yt_dlp.YoutubeDL(options) as ydl:
+        # process=False keeps 'entries' as the extractor's generator
+        playlist = ydl.extract_info(url, download=False, process=False)
+        if on_playlist is not None:
+            on_playlist(playlist)
+        entries = playlist.get("entries") or []
+        if hasattr(entries, "getslice"):
+            entries = entries.getslice()
+        for entry in entries:
+            if stop_event is not None and stop_event.is_set():
+                return
+            if entry:
+                yield entry
+
+
+class _ItemSlots:
+    """
+    Slots a playlist runs its items in. On its own it has max_parallel of them. Run
+    by a DownloadScheduler, it has only the slot it runs in and borrows free ones
+    for further items, so its items count against the scheduler's limit.
+    """
+
+    def __init__(self, max_parallel: int, scheduler=None):
+        self._scheduler = scheduler
+        self._own = 1 if scheduler is not None else max_parallel
+        self._borrowable = max_parallel - self._own
+        self._borrowed = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, stop_event: threading.Event) -> Optional[Callable[[], None]]:
+        """
+        Wait for a slot.
+        :return: A function that gives the slot back, or None if stop_event was set first.
+        """
+        with self._condition:
+            while not stop_event.is_set():
+                if self._own:
+                    self._own -= 1
+                    return self._release_own
+                if self._borrowed < self._borrowable and self._scheduler.borrow_slot():
+                    self._borrowed += 1
+                    return self._release_borrowed
+                # Scheduler slots free up without telling us; look again now and then
+                self._condition.wait(0.5)
+            return None
+
+    def _release_own(self) -> None:
+        with self._condition:
+            self._own += 1
+            self._condition.notify()
+
+    def _release_borrowed(self) -> None:
+        self._scheduler.return_slot()
+        with self._condition:
+            self._borrowed -= 1
+            self._condition.notify()
+
+
+class PlaylistDownloader:
+    """
+    Downloads a YouTube playlist by streaming its entries into a bounded pool of
+    VideoDownloaders, so the first video starts before the playlist has fully resolved.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        format: str = "video+audio",
+        quality: str = "High",
+        max_parallel: int = 3,
+        max_pending: Optional[int] = None
+    ):
+        """
+        :param output_dir: Directory where files will be saved.
+        :param format: Format of each download (video, audio, or video+audio).
+        :param quality: Quality of each download (Low, Medium, High).
+        :param max_parallel: Most videos downloaded at the same time; under a scheduler
+                             (see set_scheduler), only as many as it has slots free.
+        :param max_pending: Entries resolved ahead of the download stage (defaults to 2 x max_parallel).
+        """
+        self.output_dir = output_dir
+        self.format = format
+        self.quality = quality
+        self.max_parallel = max_parallel
+        self.max_pending = max_pending or max_parallel * 2
+        self._progress_callback: Optional[Callable] = None
+        self._stop_event = threading.Event()
+        self._throttle = None
+        self._library = None
+        self._scheduler = None
+        self._lock = threading.Lock()
+        self._discovered = 0
+        self._completed = 0
+        self._failed = 0
+
+    def set_stop_event(self, stop_event: threading.Event) -> None:
+        self._stop_event = stop_event
+
+    def set_bandwidth_throttle(self, throttle) -> None:
+        """
+        Limit the whole playlist's rate; every item shares the throttle.
+        """
+        self._throttle = throttle
+
+    def set_library(self, library) -> None:
+        """
+        Skip items that are already in the library index; every item shares it.
+        """
+        self._library = library
+
+    def set_scheduler(self, scheduler) -> None:
+        """
+        Count the items against a scheduler's concurrency limit instead of a private one.
+        :param scheduler: The DownloadScheduler running this playlist, or None.
+        """
+        self._scheduler = scheduler
+
+    def set_progress_callback(self, callback: Callable[[ProgressInfo], None]) -> None:
+        """
+        Set a callback function to receive per-item and aggregate progress updates.
+        :param callback: Function that takes a ProgressInfo record whose extra fields
+                         hold the playlist index and counters
+        """
+        self._progress_callback = callback
+
+    def iter_entries(self, url: str) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily yields the flat entries of a playlist, page by page.
+        :param url: The URL of the YouTube playlist.
+        """
+        def set_title(playlist: Dict[str, Any]) -> None:
+            self._playlist_title = playlist.get("title")
+
+        return iter_flat_entries(url, self._stop_event, set_title)
+
+    def download_playlist(self, url: str) -> Dict[str, Any]:
+        """
+        Downloads every video of a playlist with bounded parallelism.
+        :param url: The URL of the YouTube playlist.
+        :return: Dictionary containing the aggregate download results
+        """
+        if not is_playlist_url(url):
+            raise ValueError("Invalid YouTube playlist URL")
+
+        self._playlist_title = None
+        self._discovered = self._completed = self._failed = 0
+        failures = []
+        # Bounds how far entry resolution runs ahead of the downloads
+        slots = threading.Semaphore(self.max_pending)
+        item_slots = _ItemSlots(self.max_parallel, self._scheduler)
+
+        # One event per item whose merge or transcode is still on the postprocessing stage
+        postprocessing: List[threading.Event] = []
+
+        def item_finished(index: int, entry: Dict[str, Any], error: Optional[BaseException]) -> None:
+            with self._lock:
+                if error is None:
+                    self._completed += 1
+                else:
+                    self._failed += 1
+                    failures.append({"index": index, "id": entry.get("id"), "error": str(error)})
+            if error is not None and not self._stop_event.is_set():
+                logger.error(f"Playlist item {index} failed: {str(error)}")
+            self._report(ProgressInfo("item_done"), index, entry)
+
+        def download_entry(index: int, entry: Dict[str, Any]) -> None:
+            release_slot = None
+            downloader = None
+            try:
+                release_slot = item_slots.acquire(self._stop_event)
+                if release_slot is None:
+                    raise Exception("Download cancelled by user")
+                entry_url = self._entry_url(entry)
+                if self.format == "audio":
+                    downloader = AudioDownloader(self.output_dir, quality=self.quality)
+                else:
+                    downloader = VideoDownloader(self.output_dir, self.format, self.quality)
+                downloader.set_stop_event(self._stop_event)
+                downloader.set_bandwidth_throttle(self._throttle)
+                downloader.set_library(self._library)
+                downloader.set_progress_callback(
+                    lambda progress: self._report(progress, index, entry)
+                )
+                # Return once the transfer is done, so the slot goes to the next item while this one is muxed
+                downloader.set_postprocess_handoff(True)
+                pending = downloader.download_video(entry_url).get('pending_postprocess')
+            except Exception as e:
+                if downloader is not None:
+                    # Items are not retried, so their partial file will not be resumed
+                    downloader.release_filename()
+                item_finished(index, entry, e)
+                return
+            finally:
+                if release_slot is not None:
+                    release_slot()
+                slots.release()
+            if pending is None:
+                item_finished(index, entry, None)
+                return
+            done = threading.Event()
+            with self._lock:
+                postprocessing.append(done)
+
+            def finish(future) -> None:
+                try:
+                    item_finished(index, entry, future.exception())
+                finally:
+                    done.set()
+
+            pending.add_done_callback(finish)
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel) as executor:
+            for index, entry in enumerate(self.iter_entries(url), start=1):
+                slots.acquire()
+                if self._stop_event.is_set():
+                    slots.release()
+                    break
+                with self._lock:
+                    self._discovered += 1
+                executor.submit(download_entry, index, entry)
+
+        if self._stop_event.is_set():
+            raise Exception("Download cancelled by user")
+        for done in postprocessing:
+            done.wait()
+
+        logger.info(
+            f"Playlist finished: {self._completed} downloaded, {self._failed} failed"
+        )
+        return {
+            'status': 'completed',
+            'filename': self._playlist_title,
+            'filepath': self.output_dir,
+            'title': self._playlist_title,
+            'items_total': self._discovered,
+            'items_completed': self._completed,
+            'items_failed': self._failed,
+            'failures': failures
+        }
+
+    # Lets DownloadManager run a playlist like any other download
+    download_video = download_playlist
+
+    @staticmethod
+    def _entry_url(entry: Dict[str, Any]) -> str:
+        if entry.get("id"):
+            return f"https://www.youtube.com/watch?v={entry['id']}"
+        return entry["url"]
+
+    def _report(self, progress: ProgressInfo, index: int, entry: Dict[str, Any]) -> None:
+        if self._progress_callback is None:
+            return
+        with self._lock:
+            progress = progress._replace(extra={
+                "playlist_title": self._playlist_title,
+                "playlist_index": index,
+                "video_id": entry.get("id"),
+                "items_discovered": self._discovered,
+                "items_completed": self._completed,
+                "items_failed": self._failed
+            })
+        self._progress_callback(progress)
@@ -0,0 +1,147 @@
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+from downloader.library import file_checksum
+from utils.logger import logger
+
+# Output extension -> ffmpeg muxer
+MERGE_MUXERS = {
+    "mp4": "mp4",
+    "m4a": "ipod",
+    "mkv": "matroska",
+    "webm": "webm",
+    "mov": "mov",
+}
+
+
+def merge_streams(stream_paths: List[str], target_path: str, metadata: Optional[Dict[str, str]] = None) -> str:
+    """
+    Muxes separately downloaded streams into one file without re-encoding,
+    embedding the given metadata tags. Runs inside a worker process.
+    :param stream_paths: Downloaded video and audio streams.
+    :param target_path: Final output file; its extension selects the container.
+    :param metadata: Tags such as title and artist.
+    :return: The path of the merged file.
+    """
+    ext = os.path.splitext(target_path)[1].lstrip(".").lower()
+    temp_path = f"{target_path}.part"
+    command = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y"]
+    for path in stream_paths:
+        command += ["-i", path]
+    for index in range(len(stream_paths)):
+        command += ["-map", str(index)]
+    command += ["-c", "copy"]
+    for key, value in (metadata or {}).items():
+        if value:
+            command += ["-metadata", f"{key}={value}"]
+    command += ["-f", MERGE_MUXERS.get(ext, ext), temp_path]
+    try:
+        completed = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if completed.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed: {completed.stderr.decode(errors='replace').strip()}")
+        os.replace(temp_path, target_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    for path in stream_paths:
+        os.remove(path)
+    return target_path
+
+
+def _run_task(function: Callable[..., str], args: tuple) -> Dict[str, Any]:
+    # Runs in the worker process; hashing here keeps the parent's threads free
+    started = time.time()
+    path = function(*args)
+    return {
+        'filepath': path,
+        'filesize': os.path.getsize(path),
+        'checksum': file_checksum(path),
+        'started': started,
+        'seconds': time.time() - started,
+    }
+
+
+class PostprocessStage:
+    """
+    Bounded process pool for CPU- and disk-heavy work that follows a download:
+    muxing streams, transcoding audio, embedding metadata. Downloads hand their
+    postprocessing off here and free their download slot straight away, so
+    transfer and mux capacity can be sized separately.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        """
+        :param max_workers: Worker processes (defaults to the number of CPUs).
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pending = 0
+        self._completed = 0
+        self._failed = 0
+        self._busy_seconds = 0.0
+        self._wait_seconds = 0.0
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                from concurrent.futures import ProcessPoolExecutor
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._pool
+
+    def submit(self, function: Callable[..., str], *args: Any) -> Future:
+        """
+        Queue a postprocessing task.
+        :param function: Picklable function returning the path of the file it produced.
+        :return: A future with 'filepath', 'filesize', 'checksum' and 'seconds' of the output.
+        """
+        submitted = time.time()
+        future = self._get_pool().submit(_run_task, function, args)
+        with self._lock:
+            self._pending += 1
+
+        def account(done: Future) -> None:
+            with self._lock:
+                self._pending -= 1
+                if done.exception() is not None:
+                    self._failed += 1
+                    return
+                output = done.result()
+                self._completed += 1
+                self._busy_seconds += output['seconds']
+                self._wait_seconds += max(0.0, output['started'] - submitted)
+
+        future.add_done_callback(account)
+        return future
+
+    def queue_depth(self) -> int:
+        """
+        Tasks submitted and not finished yet, running or waiting for a worker.
+        """
+        with self._lock:
+            return self._pending
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'queue_depth': self._pending,
+                'completed': self._completed,
+                'failed': self._failed,
+                'busy_seconds': round(self._busy_seconds, 3),
+                'wait_seconds': round(self._wait_seconds, 3),
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)
+            logger.info("Postprocessing stage shut down.")
+
+
+# Shared by every downloader, so muxing and transcoding share one bounded pool
+postprocess_stage = PostprocessStage()
@@ -0,0 +1,33 @@
+"""
+yt-dlp and its extractor registry are a large share of start-up time, so the
+downloader modules import yt-dlp on first use instead of at module level.
+Interactive front-ends call start_background_preload() once they are on
+screen, so the first extraction does not pay the import cost either.
+"""
+import threading
+from utils.logger import logger
+
+
+def preload_yt_dlp() -> None:
+    """
+    Import yt-dlp and build its extractor classes.
+    """
+    import yt_dlp
+    from yt_dlp.extractor import gen_extractor_classes
+    gen_extractor_classes()
+
+
+def start_background_preload() -> threading.Thread:
+    """
+    Run preload_yt_dlp on a daemon thread.
+    :return: The started thread.
+    """
+    def preload():
+        try:
+            preload_yt_dlp()
+        except Exception as e:
+            logger.warning(f"Background preload of yt-dlp failed: {str(e)}")
+
+    thread = threading.Thread(target=preload, name="preload-yt-dlp", daemon=True)
+    thread.start()
+    return thread
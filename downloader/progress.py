@@ -0,0 +1,127 @@
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from utils.logger import logger
+
+
+class ProgressInfo(NamedTuple):
+    """
+    Compact progress record passed from downloaders to progress callbacks.
+    """
+    status: str
+    filename: Optional[str] = None
+    downloaded_bytes: int = 0
+    total_bytes: int = 0  # Exact size when known, otherwise yt-dlp's estimate
+    speed: float = 0.0
+    eta: Optional[int] = None
+    percentage: float = 0.0
+    elapsed: float = 0.0
+    connections: int = 1  # Fragments or chunks fetched in parallel
+    extra: Optional[Dict[str, Any]] = None  # Downloader-specific fields, e.g. playlist counters
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Flatten the record (including extra fields) into a plain dictionary.
+        """
+        data = self._asdict()
+        data.update(data.pop("extra") or {})
+        return data
+
+
+class _Deadlines:
+    """
+    One background thread that runs callbacks at their deadlines, shared by every
+    coalescer so the progress hook never has to start a thread of its own.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._heap: List[Tuple[float, int, Callable[[], None]]] = []
+        self._sequence = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+
+    def call_at(self, deadline: float, callback: Callable[[], None]) -> None:
+        """
+        :param deadline: time.monotonic() value after which callback runs.
+        """
+        with self._condition:
+            heapq.heappush(self._heap, (deadline, next(self._sequence), callback))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="progress-deadlines", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    self._condition.wait(self._heap[0][0] - time.monotonic() if self._heap else None)
+                callback = heapq.heappop(self._heap)[2]
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Progress flush failed: {str(e)}")
+
+
+_deadlines = _Deadlines()
+
+
+class ProgressCoalescer:
+    """
+    Rate-limits one job's progress records. Within each interval only the latest
+    'downloading' record is kept, and it is emitted when the interval ends even
+    if no newer record arrives (e.g. the transfer stalls); any other status is a
+    state transition and is always emitted immediately.
+    """
+
+    def __init__(self, emit: Callable[[ProgressInfo], None], interval: float = 0.25):
+        """
+        :param emit: Called with each record that passes the rate limit.
+        :param interval: Minimum seconds between two 'downloading' records.
+        """
+        self._emit = emit
+        self.interval = interval
+        self._last_emit = 0.0
+        self._pending: Optional[ProgressInfo] = None
+        self._deadline: Optional[object] = None  # Token of the scheduled flush, if any
+        # Held while emitting too, so a held-back record never overtakes a transition
+        self._lock = threading.Lock()
+
+    def push(self, info: ProgressInfo) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if info.status == "downloading" and now - self._last_emit < self.interval:
+                self._pending = info
+                if self._deadline is None:
+                    token = self._deadline = object()
+                    _deadlines.call_at(self._last_emit + self.interval, lambda: self._on_deadline(token))
+                return
+            # Transitions supersede any pending record
+            self._pending = None
+            self._last_emit = now
+            self._emit(info)
+
+    def flush(self) -> None:
+        """
+        Emit the record held back by the rate limit, if any. Call when the job
+        stops transferring, so its last progress is not lost.
+        """
+        with self._lock:
+            self._deadline = None
+            self._emit_pending()
+
+    def _on_deadline(self, token: object) -> None:
+        with self._lock:
+            if self._deadline is not token:
+                return  # Flushed in the meantime
+            self._deadline = None
+            self._emit_pending()
+
+    def _emit_pending(self) -> None:
+        # Called with the lock held
+        info, self._pending = self._pending, None
+        if info is not None:
+            self._last_emit = time.monotonic()
+            self._emit(info)
@@ -0,0 +1,271 @@
+import random
+import re
+import socket
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterator, NamedTuple, Optional
+from utils.logger import logger
+
+# Circuit breaker states
+CIRCUIT_CLOSED = "closed"        # Jobs start normally
+CIRCUIT_OPEN = "open"            # The host is throttling us; jobs wait for the cooldown
+CIRCUIT_HALF_OPEN = "half_open"  # Cooldown over; a single probe job decides whether to close
+
+_HTTP_STATUS = re.compile(r"HTTP Error (\d{3})")
+# Messages yt-dlp uses when YouTube rate-limits or bot-checks a client
+_THROTTLE_MESSAGES = ("too many requests", "rate-limit", "rate limit", "confirm you're not a bot",
+                      "confirm you’re not a bot")
+_TIMEOUT_MESSAGES = ("timed out", "timeout", "connection reset", "connection aborted",
+                     "remote end closed", "temporary failure in name resolution")
+# yt-dlp network errors, matched by name so yt-dlp is only imported by the downloaders
+_TRANSIENT_TYPES = {"TransportError", "IncompleteRead", "ContentTooShortError", "RetryableError"}
+_PERMANENT_TYPES = {"InsufficientSpaceError", "UnsupportedError", "GeoRestrictedError",
+                    "UserNotLive", "PostProcessingError"}
+
+
+class RetryDecision(NamedTuple):
+    """
+    How a failed download should be treated.
+    """
+    transient: bool                     # Worth retrying
+    throttled: bool = False             # The server asked us to slow down (HTTP 429, bot check)
+    retry_after: Optional[float] = None  # Seconds the server asked us to wait, if it said
+    reason: str = ""
+
+
+def _causes(error: BaseException) -> Iterator[BaseException]:
+    # yt-dlp wraps the original exception in exc_info or cause rather than chaining it
+    seen = set()
+    pending = [error]
+    while pending:
+        current = pending.pop(0)
+        if current is None or id(current) in seen:
+            continue
+        seen.add(id(current))
+        yield current
+        exc_info = getattr(current, "exc_info", None)
+        if isinstance(exc_info, tuple) and len(exc_info) > 1:
+            pending.append(exc_info[1])
+        cause = getattr(current, "cause", None)
+        if isinstance(cause, BaseException):
+            pending.append(cause)
+        pending.append(current.__cause__)
+
+
+def _http_status(error: BaseException) -> Optional[int]:
+    status = getattr(error, "status", None) or getattr(error, "code", None)
+    if isinstance(status, int):
+        return status
+    match = _HTTP_STATUS.search(str(error))
+    return int(match.group(1)) if match else None
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or getattr(error, "headers", None)
+    if not headers:
+        return None
+    try:
+        value = headers.get("Retry-After")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        # An HTTP date instead of seconds; fall back to our own backoff
+        return None
+
+
+def classify_error(error: BaseException) -> RetryDecision:
+    """
+    Decide whether a download error is transient. Rate limiting, 5xx responses,
+    timeouts, dropped connections and unexpected extractor failures are; invalid
+    URLs, unavailable or private videos, missing space and other client errors are not.
+    """
+    for cause in _causes(error):
+        names = {cls.__name__ for cls in type(cause).__mro__}
+        message = str(cause).lower()
+        if names & _PERMANENT_TYPES or isinstance(cause, ValueError):
+            return RetryDecision(False, reason=str(cause))
+        status = _http_status(cause)
+        if status == 429 or any(text in message for text in _THROTTLE_MESSAGES):
+            return RetryDecision(True, True, _retry_after(cause), str(cause))
+        if status is not None and status >= 500:
+            return RetryDecision(True, reason=str(cause))
+        if status == 403:
+            # Usually an expired signed format URL; the next attempt extracts fresh ones
+            return RetryDecision(True, reason=str(cause))
+        if status is not None and 400 <= status < 500:
+            return RetryDecision(False, reason=str(cause))
+        if isinstance(cause, (socket.timeout, TimeoutError, ConnectionError)) or names & _TRANSIENT_TYPES:
+            return RetryDecision(True, reason=str(cause))
+        if any(text in message for text in _TIMEOUT_MESSAGES):
+            return RetryDecision(True, reason=str(cause))
+        if "ExtractorError" in names:
+            # expected=True marks errors YouTube meant, e.g. "Video unavailable"
+            return RetryDecision(not getattr(cause, "expected", False), reason=str(cause))
+    return RetryDecision(False, reason=str(error))
+
+
+class RetryPolicy:
+    """
+    Retries transient failures with jittered exponential backoff, so jobs that
+    failed together do not all come back at the same moment.
+    """
+
+    def __init__(self, max_attempts: int = 5, base_delay: float = 2.0, max_delay: float = 300.0):
+        """
+        :param max_attempts: Attempts per job, including the first one.
+        :param base_delay: Backoff ceiling in seconds after the first failure; doubles each time.
+        :param max_delay: Upper bound of any single backoff.
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def should_retry(self, decision: RetryDecision, attempt: int) -> bool:
+        """
+        :param attempt: Attempts made so far.
+        """
+        return decision.transient and attempt < self.max_attempts
+
+    def delay(self, decision: RetryDecision, attempt: int) -> float:
+        """
+        Seconds to wait before the next attempt: uniformly between half and all of
+        the exponential ceiling, longer when throttled, never less than Retry-After.
+        :param attempt: Attempts made so far (1 after the first failure).
+        """
+        ceiling = self.base_delay * 2 ** (attempt - 1)
+        if decision.throttled:
+            ceiling *= 4
+        ceiling = min(self.max_delay, ceiling)
+        delay = random.uniform(ceiling / 2, ceiling)
+        if decision.retry_after:
+            delay = max(delay, min(decision.retry_after, self.max_delay))
+        return delay
+
+
+class _Circuit:
+    def __init__(self):
+        self.state = CIRCUIT_CLOSED
+        self.failures: deque = deque()
+        self.opened_until = 0.0
+        self.cooldown = 0.0
+        self.probing = False
+
+
+class HostCircuitBreaker:
+    """
+    Per-host circuit breaker. Repeated transient failures, or any throttling
+    response, open the host's circuit: no job for that host starts until the
+    cooldown has passed, then a single probe job runs and either closes the
+    circuit or reopens it with twice the cooldown. This keeps a throttling CDN
+    from being hit by a storm of retries.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        window: float = 60.0,
+        cooldown: float = 30.0,
+        max_cooldown: float = 600.0,
+        probe_interval: float = 5.0
+    ):
+        """
+        :param failure_threshold: Transient failures within the window that open the circuit.
+        :param window: Seconds over which failures are counted.
+        :param cooldown: First open period in seconds.
+        :param max_cooldown: Longest open period after repeated failed probes.
+        :param probe_interval: How long other jobs wait while a probe is running.
+        """
+        self.failure_threshold = failure_threshold
+        self.window = window
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.probe_interval = probe_interval
+        self._lock = threading.Lock()
+        self._circuits: Dict[str, _Circuit] = {}
+
+    def _circuit(self, host: str) -> _Circuit:
+        circuit = self._circuits.get(host)
+        if circuit is None:
+            circuit = self._circuits[host] = _Circuit()
+        return circuit
+
+    def acquire(self, host: str) -> float:
+        """
+        Ask to start a job against host.
+        :return: 0 if the job may start now, otherwise seconds to wait before asking again.
+        """
+        now = time.monotonic()
+        with self._lock:
+            circuit = self._circuit(host)
+            if circuit.state == CIRCUIT_OPEN:
+                if now < circuit.opened_until:
+                    return circuit.opened_until - now
+                circuit.state = CIRCUIT_HALF_OPEN
+                logger.info(f"Circuit for {host} half-open; sending a probe")
+            if circuit.state == CIRCUIT_HALF_OPEN:
+                if circuit.probing:
+                    return self.probe_interval
+                circuit.probing = True
+            return 0.0
+
+    def record_success(self, host: str) -> None:
+        """
+        The host answered normally; a half-open circuit closes.
+        """
+        with self._lock:
+            circuit = self._circuit(host)
+            if circuit.state != CIRCUIT_CLOSED:
+                logger.info(f"Circuit for {host} closed")
+            circuit.state = CIRCUIT_CLOSED
+            circuit.failures.clear()
+            circuit.cooldown = 0.0
+            circuit.probing = False
+
+    def record_failure(self, host: str, decision: RetryDecision) -> None:
+        """
+        Count a transient failure against host, opening its circuit when needed.
+        """
+        now = time.monotonic()
+        with self._lock:
+            circuit = self._circuit(host)
+            circuit.failures.append(now)
+            while circuit.failures and circuit.failures[0] < now - self.window:
+                circuit.failures.popleft()
+            if circuit.state == CIRCUIT_OPEN:
+                return
+            if (circuit.state == CIRCUIT_HALF_OPEN or decision.throttled
+                    or len(circuit.failures) >= self.failure_threshold):
+                circuit.cooldown = min(self.max_cooldown, circuit.cooldown * 2 or self.cooldown)
+                open_for = max(circuit.cooldown, decision.retry_after or 0.0)
+                circuit.state = CIRCUIT_OPEN
+                circuit.opened_until = now + open_for
+                circuit.probing = False
+                logger.warning(f"Circuit for {host} opened for {open_for:.0f} s: {decision.reason}")
+
+    def release(self, host: str) -> None:
+        """
+        The job ended without telling us anything about the host (e.g. it was
+        cancelled); let another job probe.
+        """
+        with self._lock:
+            circuit = self._circuits.get(host)
+            if circuit is not None:
+                circuit.probing = False
+
+    def state(self, host: str) -> Dict[str, Any]:
+        """
+        State of host's circuit, for progress updates.
+        """
+        with self._lock:
+            circuit = self._circuit(host)
+            return {
+                'host': host,
+                'circuit': circuit.state,
+                'circuit_retry_in': round(max(0.0, circuit.opened_until - time.monotonic()), 1)
+                if circuit.state == CIRCUIT_OPEN else 0.0,
+            }
+
+    def open_count(self) -> int:
+        with self._lock:
+            return sum(1 for circuit in self._circuits.values() if circuit.state != CIRCUIT_CLOSED)
@@ -0,0 +1,185 @@
+import heapq
+import itertools
+import threading
+from typing import Callable, List, Tuple
+from utils.logger import logger
+
+# Lower values run first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 10
+
+
+class DownloadScheduler:
+    """
+    Runs queued jobs on a bounded pool of worker threads.
+    Jobs are ordered by priority, then FIFO within the same priority.
+    """
+
+    def __init__(self, max_workers: int = 3, idle_timeout: float = 30.0):
+        """
+        :param max_workers: Maximum number of jobs running at the same time.
+        :param idle_timeout: Seconds an idle worker waits before exiting.
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self._max_workers = max_workers
+        self._idle_timeout = idle_timeout
+        self._queue: List[Tuple[int, int, Callable[[], None]]] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._paused = False
+        self._shutdown = False
+        self._workers = 0
+        self._running = 0
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers
+
+    def set_max_workers(self, max_workers: int) -> None:
+        """
+        Change the concurrency limit. Running jobs are never interrupted;
+        a lower limit takes effect as they finish.
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        with self._condition:
+            self._max_workers = max_workers
+            self._spawn_workers()
+            self._condition.notify_all()
+
+    def submit(self, task: Callable[[], None], priority: int = PRIORITY_INTERACTIVE) -> None:
+        """
+        Queue a job.
+        :param task: Callable run on a worker thread.
+        :param priority: PRIORITY_INTERACTIVE, PRIORITY_BULK or any other int (lower runs first).
+        """
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("Scheduler has been shut down")
+            heapq.heappush(self._queue, (priority, next(self._sequence), task))
+            self._spawn_workers()
+            self._condition.notify()
+
+    def pause(self) -> None:
+        """
+        Stop starting new jobs. Running jobs continue.
+        """
+        with self._condition:
+            self._paused = True
+
+    def resume(self) -> None:
+        with self._condition:
+            self._paused = False
+            self._spawn_workers()
+            self._condition.notify_all()
+
+    @property
+    def paused(self) -> bool:
+        return self._paused
+
+    def clear(self) -> int:
+        """
+        Drop every queued job that has not started yet.
+        :return: Number of jobs dropped.
+        """
+        with self._condition:
+            dropped = len(self._queue)
+            self._queue.clear()
+            self._condition.notify_all()
+            return dropped
+
+    def remove(self, task: Callable[[], None]) -> bool:
+        """
+        Remove a queued job before it starts.
+        :return: True if the job was still queued, False if it already started.
+        """
+        with self._condition:
+            for index, entry in enumerate(self._queue):
+                if entry[2] is task:
+                    self._queue[index] = self._queue[-1]
+                    self._queue.pop()
+                    heapq.heapify(self._queue)
+                    self._condition.notify_all()
+                    return True
+            return False
+
+    def borrow_slot(self) -> bool:
+        """
+        Take a free slot for work running on a thread of its own, e.g. a playlist's
+        further items, so that it counts against the concurrency limit. Fails while
+        a queued job is waiting for the slot.
+        :return: True if a slot was taken; hand it back with return_slot().
+        """
+        with self._condition:
+            if self._paused or self._shutdown or self._queue or self._running >= self._max_workers:
+                return False
+            self._running += 1
+            return True
+
+    def return_slot(self) -> None:
+        with self._condition:
+            self._running -= 1
+            self._spawn_workers()
+            self._condition.notify_all()
+
+    def pending_count(self) -> int:
+        with self._condition:
+            return len(self._queue)
+
+    def running_count(self) -> int:
+        with self._condition:
+            return self._running
+
+    def wait_idle(self, timeout: float = None) -> bool:
+        """
+        Block until no job is queued or running.
+        :return: True if the scheduler became idle, False on timeout.
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: not self._running and (not self._queue or self._paused),
+                timeout
+            )
+
+    def shutdown(self) -> None:
+        """
+        Drop queued jobs and let workers exit once their current job is done.
+        """
+        with self._condition:
+            self._shutdown = True
+            self._queue.clear()
+            self._condition.notify_all()
+
+    def _spawn_workers(self) -> None:
+        # Called with the condition held
+        if self._paused:
+            return
+        wanted = min(self._max_workers, self._running + len(self._queue))
+        while self._workers < wanted:
+            self._workers += 1
+            threading.Thread(target=self._worker, daemon=True).start()
+
+    def _can_start(self) -> bool:
+        return bool(self._queue) and not self._paused and self._running < self._max_workers
+
+    def _worker(self) -> None:
+        while True:
+            with self._condition:
+                if not self._condition.wait_for(
+                    lambda: self._shutdown or self._can_start(), self._idle_timeout
+                ) or self._shutdown or self._workers > self._max_workers:
+                    self._workers -= 1
+                    self._condition.notify()
+                    return
+                _, _, task = heapq.heappop(self._queue)
+                self._running += 1
+
+            try:
+                task()
+            except Exception as e:
+                logger.error(f"Scheduled job failed: {str(e)}")
+            finally:
+                with self._condition:
+                    self._running -= 1
+                    self._condition.notify_all()
@@ -0,0 +1,235 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+from downloader.playlist_downloader import iter_flat_entries
+from downloader.video_metadata import VideoMetadata
+from utils.logger import logger
+from utils.paths import user_data_dir
+from utils.validator import channel_videos_url, is_channel_url, is_playlist_url
+
+# Item states
+ITEM_PENDING = "pending"
+ITEM_DOWNLOADED = "downloaded"
+ITEM_SKIPPED = "skipped"  # Already published when the source was first synced without backfill
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    url TEXT PRIMARY KEY,
+    title TEXT,
+    watermark TEXT,
+    last_synced REAL
+);
+CREATE TABLE IF NOT EXISTS items (
+    source_url TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    title TEXT,
+    state TEXT NOT NULL,
+    discovered_at REAL NOT NULL,
+    PRIMARY KEY (source_url, video_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS items_video ON items (video_id);
+CREATE INDEX IF NOT EXISTS items_state ON items (state);
+"""
+
+
+def default_sync_path() -> str:
+    return os.path.join(user_data_dir(), "sync.db")
+
+
+def video_url(video_id: str) -> str:
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+def is_newest_first(url: str) -> bool:
+    """
+    Whether a source lists its videos newest first, so a sync may stop at the first known one.
+    Channel tabs and uploads playlists (IDs starting with "UU") do; other playlists
+    are in whatever order their owner chose.
+    """
+    return is_channel_url(url) or re.search(r"[?&]list=UU", url) is not None
+
+
+class SyncArchive:
+    """
+    Per-source record of every video ID a sync has seen and whether it has been
+    downloaded, plus each source's watermark (the newest ID at the last sync).
+    Kept in SQLite (WAL mode) next to the job journal.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        :param path: Database file (defaults to default_sync_path()).
+        """
+        self.path = path or default_sync_path()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def get_source(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM sources WHERE url = ?", (url,)).fetchone()
+        return dict(row) if row else None
+
+    def is_known(self, source_url: str, video_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM items WHERE source_url = ? AND video_id = ?", (source_url, video_id)
+            ).fetchone() is not None
+
+    def record_sync(
+        self,
+        source_url: str,
+        title: Optional[str],
+        watermark: Optional[str],
+        entries: List[VideoMetadata],
+        state: str = ITEM_PENDING
+    ) -> None:
+        """
+        Store the entries a sync discovered and move the source's watermark, in one transaction.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO items (source_url, video_id, title, state, discovered_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(source_url, entry.id, entry.title, state, now) for entry in entries]
+            )
+            self._conn.execute(
+                "INSERT INTO sources (url, title, watermark, last_synced) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET title = COALESCE(excluded.title, title), "
+                "watermark = COALESCE(excluded.watermark, watermark), last_synced = excluded.last_synced",
+                (source_url, title, watermark, now)
+            )
+            self._conn.execute("COMMIT")
+
+    def pending(self, source_url: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Items discovered but not downloaded yet, oldest discovery first.
+        """
+        query = "SELECT * FROM items WHERE state = ?"
+        params: tuple = (ITEM_PENDING,)
+        if source_url is not None:
+            query += " AND source_url = ?"
+            params += (source_url,)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY discovered_at", params).fetchall()
+        return [dict(row) for row in rows]
+
+    def mark_downloaded(self, video_id: str) -> None:
+        """
+        Mark a video as downloaded in every source that lists it.
+        """
+        with self._lock:
+            self._conn.execute("UPDATE items SET state = ? WHERE video_id = ?", (ITEM_DOWNLOADED, video_id))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+        logger.info("Sync archive closed.")
+
+
+class SourceSync:
+    """
+    Incremental sync of channels and playlists: walks each feed newest first and
+    stops at the first already-known content, so an unchanged source costs a
+    single page of flat metadata.
+    """
+
+    def __init__(self, archive: SyncArchive, stop_after_known: int = 3, max_workers: int = 8):
+        """
+        :param archive: Where seen IDs and watermarks are kept.
+        :param stop_after_known: Consecutive known videos after which a newest-first walk stops,
+                                 for when the watermark video itself has been removed.
+        :param max_workers: Sources walked in parallel.
+        """
+        self.archive = archive
+        self.stop_after_known = stop_after_known
+        self.max_workers = max_workers
+
+    def discover(self, source_url: str, backfill: bool = True) -> List[VideoMetadata]:
+        """
+        Find the videos of one source that earlier syncs have not seen.
+        :param source_url: Channel or playlist URL.
+        :param backfill: On the first sync, queue everything already published;
+                         when False only uploads after the first sync are downloaded.
+        :return: Records of the new videos, newest first for newest-first sources.
+        """
+        if is_channel_url(source_url):
+            feed_url = channel_videos_url(source_url)
+        elif is_playlist_url(source_url):
+            feed_url = source_url
+        else:
+            raise ValueError(f"Not a channel or playlist URL: {source_url}")
+
+        source = self.archive.get_source(source_url)
+        watermark = source["watermark"] if source else None
+        newest_first = is_newest_first(source_url)
+        info: Dict[str, Any] = {}
+        new_entries = []
+        newest_id = None
+        known_run = 0
+        for entry in iter_flat_entries(feed_url, on_playlist=info.update):
+            video_id = entry.get("id")
+            if not video_id:
+                continue
+            if newest_id is None:
+                newest_id = video_id
+            if self.archive.is_known(source_url, video_id):
+                known_run += 1
+                if newest_first and (video_id == watermark or known_run >= self.stop_after_known):
+                    break
+                continue
+            known_run = 0
+            # A backfill can find thousands of videos; keep records, not the entry dicts
+            new_entries.append(VideoMetadata.from_info(entry))
+
+        first_sync = source is None
+        state = ITEM_SKIPPED if first_sync and not backfill else ITEM_PENDING
+        self.archive.record_sync(source_url, info.get("title"), newest_id if newest_first else None,
+                                 new_entries, state)
+        if state == ITEM_SKIPPED:
+            logger.info(f"First sync of {source_url}: {len(new_entries)} existing video(s) marked as seen")
+            return []
+        logger.info(f"Synced {source_url}: {len(new_entries)} new video(s)")
+        return new_entries
+
+    def sync(self, sources: Iterable[str], backfill: bool = True) -> Dict[str, Any]:
+        """
+        Discover new videos of many sources in parallel.
+        :return: Source URL -> number of new videos, or the error message for sources that failed.
+        """
+        def discover(url: str) -> Any:
+            try:
+                return len(self.discover(url, backfill))
+            except Exception as e:
+                logger.error(f"Sync of {url} failed: {str(e)}")
+                return str(e)
+
+        sources = list(sources)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return dict(zip(sources, pool.map(discover, sources)))
+
+    def pending_urls(self, sources: Iterable[str]) -> List[str]:
+        """
+        Watch URLs of the videos of these sources not downloaded yet, including
+        ones whose download failed during an earlier run.
+        :param sources: Channel or playlist URLs synced in this run.
+        """
+        seen = set()
+        urls = []
+        for source_url in sources:
+            for item in self.archive.pending(source_url):
+                if item["video_id"] not in seen:
+                    seen.add(item["video_id"])
+                    urls.append(video_url(item["video_id"]))
+        return urls
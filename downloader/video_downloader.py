@@ -1,9 +1,24 @@
 from utils.logger import logger
-from typing import Callable, Dict, Any, Optional
-import yt_dlp
+from typing import Callable, Dict, Any, List, Optional
 import os
-from utils.validator import sanitize_filename, get_available_filename
+import copy
+import shutil
+from concurrent.futures import Future
+from utils.validator import sanitize_filename, is_playlist_url, extract_video_id, parse_youtube_url
+from utils.filename_index import get_name_index
+from downloader.metadata_cache import metadata_cache
+from downloader.progress import ProgressInfo
+from downloader.fragment_tuner import RetryCountingLogger, fragment_tuner
+from downloader.metrics import JobMetrics
+from downloader.format_planner import FormatPlan
+from downloader.disk_space import disk_admission
+from downloader.postprocess import merge_streams, postprocess_stage
+from downloader.video_metadata import VideoMetadata
 import threading
+import time
+
+# Range-request size for progressive (non-fragmented) formats
+HTTP_CHUNK_SIZE = 10 * 1024 * 1024
 
 class VideoDownloader:
     """
@@ -22,15 +37,68 @@ class VideoDownloader:
         self.quality = quality
         self._progress_callback: Optional[Callable] = None
         self._current_filename: Optional[str] = None
+        self._target_filename: Optional[str] = None
         self._stop_event = threading.Event()
+        self._throttle = None
+        self._throttled_bytes: Dict[str, int] = {}
+        self._connections = 1
+        self._tuner_key = "default"
+        self._ytdl_logger = RetryCountingLogger()
+        self._recorded_retries = 0
+        self._postprocess_started: Optional[float] = None
+        self.metrics = JobMetrics()
+        self._library = None
+        self._plan: Optional[FormatPlan] = None
+        self._defer_postprocess = False
+        # Disk admission key of the current download; it is held until postprocessing ends
+        self._reservation: Optional[object] = None
 
     def set_stop_event(self, stop_event: threading.Event) -> None:
         self._stop_event = stop_event
 
-    def set_progress_callback(self, callback: Callable[[Dict[str, Any]], None]) -> None:
+    def set_target_filename(self, filename: Optional[str]) -> None:
+        """
+        Use a fixed output filename instead of reserving a new one, so that a
+        resumed job continues from the partial file an earlier run left behind.
+        :param filename: Filename (without directory) recorded by the earlier run.
+        """
+        self._target_filename = filename
+
+    def release_filename(self) -> None:
+        """
+        Give back the filename reserved by the last attempt if it never produced a file.
+        A failed transfer keeps its name, and its partial files, so that a retry can
+        resume them; call this once the download is not going to be retried.
+        """
+        if self._current_filename is not None:
+            get_name_index(self.output_dir).release(self._current_filename)
+
+    def set_bandwidth_throttle(self, throttle) -> None:
+        """
+        Limit this download's rate.
+        :param throttle: A JobThrottle from the manager's BandwidthGovernor, or None.
+        """
+        self._throttle = throttle
+
+    def set_library(self, library) -> None:
+        """
+        Skip videos that are already downloaded and record new ones.
+        :param library: A LibraryIndex, or None.
+        """
+        self._library = library
+
+    def set_postprocess_handoff(self, enabled: bool) -> None:
+        """
+        Return as soon as the transfer finishes, leaving merging to the postprocessing stage.
+        download_video's result then carries a 'pending_postprocess' future with the final result.
+        :param enabled: Hand postprocessing off instead of waiting for it.
+        """
+        self._defer_postprocess = enabled
+
+    def set_progress_callback(self, callback: Callable[[ProgressInfo], None]) -> None:
         """
         Set a callback function to receive progress updates.
-        :param callback: Function that takes a dictionary of progress information
+        :param callback: Function that takes a ProgressInfo record
         """
         self._progress_callback = callback
 
@@ -38,106 +106,430 @@ class VideoDownloader:
         """
         Internal progress hook for yt-dlp.
         """
-        if self._progress_callback is None:
-            return
-
         if self._stop_event.is_set():
             raise Exception("Download cancelled by user")
 
-        # Prepare progress information
-        progress_info = {
-            'status': d.get('status', 'unknown'),
-            'filename': self._current_filename,
-            'elapsed': d.get('elapsed', 0),
-            'total_bytes': d.get('total_bytes', 0),
-            'total_bytes_estimate': d.get('total_bytes_estimate', 0),
-            'downloaded_bytes': d.get('downloaded_bytes', 0),
-            'speed': d.get('speed', 0),
-            'eta': d.get('eta', 0),
-            'percentage': 0.0
-        }
+        status = d.get('status', 'unknown')
+        downloaded = d.get('downloaded_bytes') or 0
+
+        if self._throttle is not None and status == 'downloading':
+            # Sleeping here holds back yt-dlp's read loop until the bandwidth budget allows more
+            key = d.get('tmpfilename') or d.get('filename') or ''
+            previous = self._throttled_bytes.get(key, 0)
+            self._throttled_bytes[key] = downloaded
+            self._throttle.consume(downloaded - previous if downloaded >= previous else downloaded,
+                                   self._stop_event)
+
+        if status == 'downloading' and downloaded:
+            self.metrics.transferred()
+            disk_admission.update(self._reservation, self.metrics.bytes_downloaded + downloaded)
+        elif status == 'finished':
+            self._record_transfer(d)
+
+        if self._progress_callback is None:
+            return
+
+        total = d.get('total_bytes') or d.get('total_bytes_estimate') or 0
 
         # Calculate percentage
-        if d['status'] == 'downloading':
-            if 'total_bytes' in d and d['total_bytes'] > 0:
-                progress_info['percentage'] = (d['downloaded_bytes'] / d['total_bytes']) * 100
-            elif 'total_bytes_estimate' in d and d['total_bytes_estimate'] > 0:
-                progress_info['percentage'] = (d['downloaded_bytes'] / d['total_bytes_estimate']) * 100
+        percentage = 0.0
+        if status == 'downloading' and total > 0:
+            percentage = (downloaded / total) * 100
+
+        # Call the callback with a compact progress record
+        self._progress_callback(ProgressInfo(
+            status,
+            self._current_filename,
+            downloaded,
+            total,
+            d.get('speed') or 0,
+            d.get('eta'),
+            percentage,
+            d.get('elapsed') or 0,
+            self._transfer_connections(d)
+        ))
+
+    def _transfer_connections(self, d: Dict[str, Any]) -> int:
+        """
+        Connections a transfer actually uses: only fragmented ones fetch in parallel.
+        """
+        return self._connections if d.get('fragment_count') else 1
+
+    def _record_transfer(self, d: Dict[str, Any]) -> None:
+        """
+        Report a finished file's throughput and retries to the fragment tuner.
+        """
+        retries = self._ytdl_logger.retries - self._recorded_retries
+        self._recorded_retries = self._ytdl_logger.retries
+        size = d.get('total_bytes') or d.get('downloaded_bytes') or 0
+        self.metrics.transferred()
+        self.metrics.bytes_downloaded += size
+        self.metrics.retries += retries
+        if not d.get('fragment_count'):
+            # Progressive transfers use one connection whatever the tuner says; they would only add noise
+            return
+        fragment_tuner.record(
+            self._connections,
+            size,
+            d.get('elapsed') or 0,
+            retries,
+            d.get('fragment_count'),
+            self._tuner_key
+        )
 
-        # Call the callback with progress information
-        self._progress_callback(progress_info)
+    def _postprocessor_hook(self, d: Dict[str, Any]) -> None:
+        """
+        Internal postprocessor hook for yt-dlp; times merging and fixups.
+        """
+        if d.get('status') == 'started':
+            self._postprocess_started = time.monotonic()
+        elif d.get('status') == 'finished' and self._postprocess_started is not None:
+            self.metrics.postprocess_seconds += time.monotonic() - self._postprocess_started
+            self._postprocess_started = None
 
     def download_video(self, url: str) -> Dict[str, Any]:
         """
-        Downloads a video from YouTube with progress tracking.
+        Downloads a video from YouTube with progress tracking, unless the
+        library index already has it in this format and quality.
         :param url: The URL of the YouTube video.
         :return: Dictionary containing download results
         """
+        existing = self._find_in_library(url)
+        if existing is not None:
+            return existing
+        result = self._download(url)
+        pending = result.pop('pending_postprocess', None)
+        if pending is None:
+            disk_admission.release(self._reservation)
+            self._add_to_library(url, result)
+            return result
+        final = self._chain_postprocess(url, result, pending, self._reservation)
+        if self._defer_postprocess:
+            return dict(result, pending_postprocess=final)
+        return final.result()
+
+    def _chain_postprocess(
+        self,
+        url: str,
+        result: Dict[str, Any],
+        pending: Future,
+        reservation: Optional[object] = None
+    ) -> Future:
+        """
+        Complete the download result once its postprocessing task has finished.
+        :param reservation: The download's disk admission, released only now: the streams
+                            and the file made from them are all on disk until the task ends.
+        :return: A future with the final result dictionary.
+        """
+        final: Future = Future()
+
+        def complete(done: Future) -> None:
+            disk_admission.release(reservation)
+            try:
+                output = done.result()
+                completed = self._complete_postprocess(result, output)
+                self._add_to_library(url, completed, output['checksum'])
+            except Exception as e:
+                logger.error(f"Postprocessing failed for {url}: {str(e)}")
+                # Postprocessing is never retried
+                self.release_filename()
+                final.set_exception(e)
+                return
+            final.set_result(completed)
+
+        pending.add_done_callback(complete)
+        return final
+
+    def _complete_postprocess(
+        self,
+        result: Dict[str, Any],
+        output: Dict[str, Any],
+        status: str = 'merged'
+    ) -> Dict[str, Any]:
+        """
+        Fold the output of a finished postprocessing task into the download result.
+        :param output: What the postprocessing stage reported for the file it produced.
+        :param status: Progress status announcing the finished file.
+        """
+        filename = os.path.basename(output['filepath'])
+        self.metrics.postprocess_seconds += output['seconds']
+        self.metrics.bytes_written = output['filesize']
+        self.metrics.finished()
+        if self._progress_callback is not None:
+            self._progress_callback(ProgressInfo(status, filename, output['filesize'], output['filesize'],
+                                                 percentage=100.0))
+        return dict(result, filename=filename, filepath=output['filepath'], filesize=output['filesize'])
+
+    def _download(self, url: str) -> Dict[str, Any]:
+        """
+        Extracts and downloads a video without consulting the library index.
+        The disk reservation stays held on success; the caller releases it once
+        the file is final (see download_video).
+        """
         if not self._validate_url(url):
             raise ValueError("Invalid YouTube URL")
+        if is_playlist_url(url):
+            raise ValueError("Playlist URLs must be downloaded with PlaylistDownloader")
         
         try:
-            # Get video info first
-            with yt_dlp.YoutubeDL() as ydl:
-                info = ydl.extract_info(url, download=False)
+            # Get video info first, reusing a previous extraction when possible
+            self.metrics = JobMetrics()
+            info = self._extract_info(url)
+            self.metrics.extracted()
+            # Everything after the transfer reads this compact record, not the full info dict
+            metadata = VideoMetadata.from_info(info)
             
             # Determine the extension based on the format
-            if self.format == "audio":
-                ext = "mp3"
-            else:
-                ext = "mp4"
+            ext = self._get_output_extension()
+
+            # Parallel fragment/chunk connections, tuned from earlier downloads
+            self._tuner_key = metadata.extractor_key or "default"
+            self._connections = fragment_tuner.choose(self._tuner_key)
+
+            # Resolve the exact formats and their size before committing to a transfer
+            self._plan = self._plan_formats(metadata)
+            if self._plan is not None and self._plan.merged and shutil.which("ffmpeg") is None:
+                raise RuntimeError("ffmpeg is required to merge video and audio streams but was not found on PATH")
             
-            # Sanitize the title and get an available filename
-            sanitized_title = sanitize_filename(info.get("title", "video"))
+            # Sanitize the title and reserve an available filename, shared with concurrent downloads
+            sanitized_title = sanitize_filename(metadata.title or "video")
             base_filename = f"{sanitized_title}.{ext}"
-            print("Base filename: ", base_filename)
-            final_filename = get_available_filename(self.output_dir, base_filename)
+            logger.debug(f"Base filename: {base_filename}")
+            name_index = get_name_index(self.output_dir)
+            if self._target_filename:
+                final_filename = self._target_filename
+                name_index.claim(final_filename)
+            else:
+                final_filename = name_index.reserve(base_filename)
             self._current_filename = final_filename
-            print("Final filename: ", final_filename)
             
             logger.info(f"Video title sanitized: {sanitized_title}")
             logger.info(f"Final filename: {final_filename}")
 
             # yt-dlp options
             final_base_filename = os.path.splitext(final_filename)[0]
-            options = {
-                "format": self._get_format_option(),
-                "outtmpl": os.path.join(self.output_dir, f"{final_base_filename}.%(ext)s"),
-                "quiet": False,
-                "no_warnings": False,
-                "nooverwrites": True,
-                "progress_hooks": [self._progress_hook],
-                "merge_output_format": ext,  # Ensure the output format is set to the determined extension
-            }
+            options = self._build_options(final_base_filename, ext)
+
+            # Hold the job back until its output volume has room for it and every running job.
+            # Each download gets its own key, since the reservation outlives the transfer.
+            reservation = self._reservation = object()
+            required_space = self._required_space(self._plan)
+            if required_space:
+                try:
+                    disk_admission.acquire(reservation, self.output_dir, required_space, self._stop_event,
+                                           self._report_waiting_for_space)
+                except Exception:
+                    # Nothing was written, so the reserved name can go to the next download
+                    name_index.release(final_filename)
+                    raise
 
             try:
-                with yt_dlp.YoutubeDL(options) as ydl:
-                    ydl.download([url])
+                with self._create_ydl(options) as ydl:
+                    # Download from the cached info instead of extracting again
+                    result_info = ydl.process_ie_result(copy.deepcopy(info), download=True)
+                # Keep only the written paths; the info dicts are not needed any more
+                filepaths = [download.get('filepath') for download in
+                             (result_info or {}).get('requested_downloads') or [{}]]
+                del info, result_info
             except Exception as e:
-                if self._stop_event.is_set():
-                    # Remove partially downloaded files
-                    part_files = [f for f in os.listdir(self.output_dir) if f.startswith(final_base_filename) and f.endswith('.part')]
-                    for part_file in part_files:
-                        os.remove(os.path.join(self.output_dir, part_file))
-                    logger.info("Partially downloaded files removed.")
+                disk_admission.release(reservation)
+                if not self._stop_event.is_set():
+                    # The cached format URLs may have expired; extract afresh next time
+                    metadata_cache.invalidate(url)
+                else:
+                    self._remove_partial_files(final_base_filename)
+                    name_index.release(final_filename)
                 raise e
             
             logger.info("Download completed successfully.")
+
+            # Report the file yt-dlp actually wrote, whose extension may differ from the reserved name
+            if self._plan is not None and self._plan.merged:
+                try:
+                    return self._start_merge(metadata, filepaths, os.path.join(self.output_dir, final_filename))
+                except Exception:
+                    disk_admission.release(reservation)
+                    raise
+            filepath = filepaths[0] or os.path.join(self.output_dir, final_filename)
+            if os.path.exists(filepath):
+                self.metrics.bytes_written = os.path.getsize(filepath)
+            self.metrics.finished()
             
             return {
                 'status': 'completed',
-                'filename': final_filename,
-                'filepath': os.path.join(self.output_dir, final_filename),
-                'title': info.get('title'),
-                'duration': info.get('duration'),
-                'filesize': info.get('filesize'),
-                'format': info.get('format')
+                'filename': os.path.basename(filepath),
+                'filepath': filepath,
+                'title': metadata.title,
+                'duration': metadata.duration,
+                'filesize': self.metrics.bytes_written or metadata.filesize,
+                'estimated_size': self._plan.estimated_size if self._plan else None,
+                'format': self._plan.format_id if self._plan else metadata.format
             }
 
         except Exception as e:
             logger.error(f"Error during download: {str(e)}")
             raise
 
+    def _start_merge(self, metadata: VideoMetadata, filepaths: List[Optional[str]], target_path: str) -> Dict[str, Any]:
+        """
+        Hand the separately downloaded streams to the postprocessing stage, which
+        muxes them and embeds the metadata while this job's download slot is freed.
+        :return: The download result with a 'pending_postprocess' future.
+        """
+        stream_paths = [path for path in filepaths if path]
+        tags = {
+            'title': metadata.title,
+            'artist': metadata.uploader,
+            'date': metadata.upload_date,
+            'comment': metadata.webpage_url,
+        }
+        if self._progress_callback is not None:
+            self._progress_callback(ProgressInfo('merging', os.path.basename(target_path)))
+        return {
+            'status': 'completed',
+            'filename': os.path.basename(target_path),
+            'filepath': target_path,
+            'title': metadata.title,
+            'duration': metadata.duration,
+            'filesize': None,
+            'estimated_size': self._plan.estimated_size,
+            'format': self._plan.format_id,
+            'pending_postprocess': postprocess_stage.submit(merge_streams, stream_paths, target_path, tags),
+        }
+
+    def _extract_info(self, url: str) -> Dict[str, Any]:
+        """
+        Get the info dictionary for a URL. Overridden by the offline benchmarks.
+        """
+        return metadata_cache.get_or_extract(url)
+
+    def _create_ydl(self, options: Dict[str, Any]):
+        """
+        Create the YoutubeDL instance that performs the download. Overridden by the offline benchmarks.
+        """
+        import yt_dlp
+        return yt_dlp.YoutubeDL(options)
+
+    def _plan_formats(self, metadata: VideoMetadata) -> Optional[FormatPlan]:
+        """
+        Resolve the format selector to exact format IDs against the record's packed
+        format table; None falls back to the selector.
+        """
+        try:
+            return metadata.plan_formats(self._get_format_option())
+        except Exception as e:
+            logger.warning(f"Could not plan formats, leaving the choice to yt-dlp: {str(e)}")
+            return None
+
+    def _required_space(self, plan: Optional[FormatPlan]) -> int:
+        """
+        Bytes of free space the download needs at its peak, or 0 if unknown.
+        Merging keeps the separate streams on disk until the merged file is complete.
+        """
+        if plan is None or not plan.estimated_size:
+            return 0
+        return plan.estimated_size * (2 if plan.merged else 1)
+
+    def _report_waiting_for_space(self) -> None:
+        if self._progress_callback is not None:
+            self._progress_callback(ProgressInfo('waiting_for_space', self._current_filename))
+
+    def library_format(self) -> str:
+        """
+        Format key under which this downloader's files are recorded in the library.
+        """
+        return self.format
+
+    def _find_in_library(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Look the URL's video up in the library before any network request.
+        :return: A download result for the existing file, or None.
+        """
+        video_id = extract_video_id(url)
+        if self._library is None or video_id is None:
+            return None
+        entry = self._library.lookup(video_id, self.library_format(), self.quality)
+        if entry is None:
+            return None
+        filename = os.path.basename(entry['path'])
+        logger.info(f"Already downloaded, skipping: {entry['path']}")
+        if self._progress_callback is not None:
+            self._progress_callback(ProgressInfo('exists', filename, entry['size'], entry['size'], percentage=100.0))
+        return {
+            'status': 'completed',
+            'skipped': True,
+            'filename': filename,
+            'filepath': entry['path'],
+            'title': entry['title'],
+            'filesize': entry['size'],
+        }
+
+    def _add_to_library(self, url: str, result: Dict[str, Any], checksum=True) -> None:
+        video_id = extract_video_id(url)
+        if self._library is None or video_id is None:
+            return
+        try:
+            self._library.add(video_id, self.library_format(), self.quality, result['filepath'],
+                              result.get('title'), checksum)
+        except OSError as e:
+            logger.warning(f"Could not add {result['filepath']} to the library: {str(e)}")
+
+    def _get_output_extension(self) -> str:
+        """
+        Get the extension of the final output file for the desired format.
+        """
+        if self.format == "audio":
+            return "mp3"
+        return "mp4"
+
+    def _build_options(self, base_filename: str, ext: str) -> Dict[str, Any]:
+        """
+        Build the yt-dlp options for downloading to base_filename.
+        :param base_filename: Output filename without its extension.
+        :param ext: Extension of the final output file.
+        """
+        if self._plan is not None and self._plan.merged:
+            # Fetch each stream to its own file; the postprocessing stage muxes them
+            format_option = ",".join(self._plan.format_ids)
+            outtmpl = f"{base_filename}.f%(format_id)s.%(ext)s"
+        else:
+            format_option = self._plan.format_id if self._plan else self._get_format_option()
+            outtmpl = f"{base_filename}.%(ext)s"
+        return {
+            "format": format_option,
+            "outtmpl": os.path.join(self.output_dir, outtmpl),
+            "quiet": False,
+            "no_warnings": False,
+            "logger": self._ytdl_logger,
+            "noprogress": True,  # Progress is reported through the hook instead
+            "concurrent_fragment_downloads": self._connections,
+            "http_chunk_size": HTTP_CHUNK_SIZE,
+            "nooverwrites": True,
+            "continuedl": True,  # Resume from .part files left by an interrupted run
+            "progress_hooks": [self._progress_hook],
+            "postprocessor_hooks": [self._postprocessor_hook],
+            "merge_output_format": ext,  # Ensure the output format is set to the determined extension
+        }
+
+    def _remove_partial_files(self, base_filename: str) -> None:
+        """
+        Remove the partial files this download left in the output directory.
+        Runs on the download's worker thread, never on the UI thread.
+        :param base_filename: Output filename without its extension.
+        """
+        for entry in os.scandir(self.output_dir):
+            name = entry.name
+            # "Title(1).mp4.part" belongs to another download that the name index renamed
+            if not name.startswith(f"{base_filename}."):
+                continue
+            # Also the finished streams of a merged download that was cancelled before its merge
+            if ".part" in name or name.endswith(".ytdl") or name.startswith(f"{base_filename}.f"):
+                try:
+                    os.remove(entry.path)
+                except OSError as e:
+                    logger.warning(f"Could not remove partial file {name}: {str(e)}")
+        logger.info("Partially downloaded files removed.")
+
     def _get_format_option(self) -> str:
         """
         Get the format option for yt-dlp based on the desired format.
@@ -169,5 +561,4 @@ class VideoDownloader:
         :param url: The URL to validate.
         :return: True if valid, False otherwise.
         """
-        return ("youtube.com/watch" in url or "youtu.be/" in url 
-        or "youtube.com/shorts" in url or "youtube.com/playlist" in url)
\ No newline at end of file
+        return parse_youtube_url(url) is not None
\ No newline at end of file
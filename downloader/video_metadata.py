@@ -0,0 +1,141 @@
+import math
+import sys
+from array import array
+from typing import Any, Dict, Iterable, List, Optional
+from downloader.format_planner import FormatPlan, plan_formats
+
+# Format fields kept for selection and size estimates; everything else (URLs,
+# headers, fragments, manifests) is only needed while downloading
+_FORMAT_TEXT_FIELDS = ("format_id", "ext", "vcodec", "acodec", "protocol", "language", "dynamic_range",
+                       "format_note", "container")
+_FORMAT_NUMBER_FIELDS = ("height", "width", "fps", "tbr", "abr", "vbr", "asr", "filesize", "filesize_approx",
+                         "quality", "source_preference", "preference", "language_preference")
+_FORMAT_INTEGER_FIELDS = frozenset({"height", "width", "asr", "filesize", "filesize_approx"})
+
+
+def _intern(value: Any) -> Optional[str]:
+    # Codec, extension and protocol names repeat across every video; share one string each
+    return sys.intern(value) if isinstance(value, str) else None
+
+
+class FormatTable:
+    """
+    The formats of one video packed row by row into a single array of doubles
+    (NaN for missing numbers) and a single tuple of interned strings, in
+    yt-dlp's order (worst to best). About 2 KB instead of the tens of KB the
+    format dicts take.
+    """
+    __slots__ = ("_text", "_numbers", "_count")
+
+    def __init__(self, formats: Iterable[Dict[str, Any]]):
+        """
+        :param formats: The 'formats' list of an info dictionary.
+        """
+        formats = list(formats)
+        self._count = len(formats)
+        self._text = tuple(_intern(f.get(field)) for f in formats for field in _FORMAT_TEXT_FIELDS)
+        self._numbers = array("d", (
+            float(value) if isinstance(value, (int, float)) else math.nan
+            for value in (f.get(field) for f in formats for field in _FORMAT_NUMBER_FIELDS)
+        ))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def row(self, index: int) -> Dict[str, Any]:
+        """
+        One format as a minimal dictionary, without the fields that were missing.
+        """
+        row: Dict[str, Any] = {}
+        start = index * len(_FORMAT_TEXT_FIELDS)
+        for field, value in zip(_FORMAT_TEXT_FIELDS, self._text[start:start + len(_FORMAT_TEXT_FIELDS)]):
+            if value is not None:
+                row[field] = value
+        start = index * len(_FORMAT_NUMBER_FIELDS)
+        for field, value in zip(_FORMAT_NUMBER_FIELDS, self._numbers[start:start + len(_FORMAT_NUMBER_FIELDS)]):
+            if not math.isnan(value):
+                row[field] = int(value) if field in _FORMAT_INTEGER_FIELDS else value
+        return row
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """
+        The formats as dictionaries yt-dlp's format selector accepts.
+        """
+        return [self.row(index) for index in range(self._count)]
+
+
+class VideoMetadata:
+    """
+    The fields of a yt-dlp info dictionary that the app actually uses, plus a
+    packed format table. Built once per video so the full info dictionary,
+    often hundreds of KB, can be dropped straight away.
+    """
+    __slots__ = ("id", "title", "duration", "uploader", "upload_date", "view_count", "thumbnail",
+                 "webpage_url", "extractor_key", "filesize", "format", "formats")
+
+    def __init__(
+        self,
+        id: Optional[str],
+        title: Optional[str] = None,
+        duration: Optional[float] = None,
+        uploader: Optional[str] = None,
+        upload_date: Optional[str] = None,
+        view_count: Optional[int] = None,
+        thumbnail: Optional[str] = None,
+        webpage_url: Optional[str] = None,
+        extractor_key: Optional[str] = None,
+        filesize: Optional[int] = None,
+        format: Optional[str] = None,
+        formats: Optional[FormatTable] = None
+    ):
+        self.id = id
+        self.title = title
+        self.duration = duration
+        self.uploader = uploader
+        self.upload_date = upload_date
+        self.view_count = view_count
+        self.thumbnail = thumbnail
+        self.webpage_url = webpage_url
+        self.extractor_key = extractor_key
+        self.filesize = filesize
+        self.format = format
+        self.formats = formats
+
+    @classmethod
+    def from_info(cls, info: Dict[str, Any]) -> "VideoMetadata":
+        """
+        Build a record from an info dictionary (full or flat playlist entry).
+        Keeps no reference to the dictionary or anything inside it but strings and numbers.
+        """
+        formats = info.get("formats")
+        return cls(
+            info.get("id"),
+            info.get("title"),
+            info.get("duration"),
+            info.get("uploader") or info.get("channel"),
+            info.get("upload_date"),
+            info.get("view_count"),
+            info.get("thumbnail"),
+            info.get("webpage_url") or info.get("url"),
+            _intern(info.get("extractor_key") or info.get("ie_key")),
+            info.get("filesize") or info.get("filesize_approx"),
+            info.get("format"),
+            FormatTable(formats) if formats else None,
+        )
+
+    def plan_formats(self, selector: str) -> Optional[FormatPlan]:
+        """
+        Resolve a format selector against the packed formats, as plan_formats does for a full info dict.
+        """
+        if not self.formats:
+            return None
+        return plan_formats({'formats': self.formats.to_dicts(), 'duration': self.duration}, selector)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        The scalar fields as a dictionary, e.g. for JSON output.
+        """
+        return {field: getattr(self, field) for field in self.__slots__ if field != "formats"}
+
+    def __repr__(self) -> str:
+        return f"VideoMetadata(id={self.id!r}, title={self.title!r})"
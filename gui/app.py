@@ -2,17 +2,24 @@ import tkinter as tk
 from tkinter import ttk, filedialog
 import ttkbootstrap as tb
 from ttkbootstrap.constants import *
-import yt_dlp
-from downloader.video_downloader import VideoDownloader
-from downloader.download_manager import DownloadManager
+from downloader.download_manager import DownloadManager, create_downloader
+from downloader.journal import JobJournal
+from downloader.library import LibraryIndex
+from downloader.progress import ProgressInfo
+from gui.thumbnails import ThumbnailService
+from downloader.metadata_service import metadata_service
+from downloader.preload import start_background_preload
 from utils.logger import logger
+from utils.validator import is_playlist_url
 from datetime import datetime
-import requests
-from PIL import Image, ImageTk, ImageDraw
-import io
+from collections import deque
+import asyncio
 import threading
 import os
 
+# Number of lines kept in the log view; older lines are dropped
+MAX_LOG_LINES = 1000
+
 # Define a dictionary to map user-friendly labels to internal quality settings
 QUALITY_MAPPING = {
     "Low (up to 480p)": "Low",
@@ -26,17 +33,20 @@ class VideoDownloaderApp:
         self.root.title("YouTube Video Downloader")
         self.root.geometry("800x500")
         
-        # Load the icon
+        # Load the icon with Tk's own PNG support, so PIL is not needed before the window shows
         icon_path = "assets/youtube.png"  # Update the path to your icon
-        icon_image = Image.open(icon_path)
-        icon_image = icon_image.resize((24, 24), Image.LANCZOS)
-        self.icon_photo = ImageTk.PhotoImage(icon_image)
+        icon_image = tk.PhotoImage(file=icon_path)
+        self.icon_photo = icon_image.subsample(max(1, icon_image.width() // 24))
 
         # Set the title bar icon
         self.root.iconphoto(False, self.icon_photo)
         
-        # Initialize download manager
-        self.download_manager = DownloadManager()
+        # Thumbnails are fetched over one pooled session and cached on disk
+        self.thumbnail_service = ThumbnailService()
+
+        # Initialize download manager, backed by the job journal so interrupted jobs survive restarts
+        # and by the library index so videos already on disk are not downloaded again
+        self.download_manager = DownloadManager(journal=JobJournal(), library=LibraryIndex())
         
         # Initialize ttkbootstrap style
         self.style = tb.Style("darkly")
@@ -227,6 +237,8 @@ class VideoDownloaderApp:
         )
         self.log_text.pack(fill=BOTH, expand=True, padx=5, pady=5)
         self.scrollbar.config(command=self.log_text.yview)
+        # Ring buffer of lines waiting to be written, flushed on every progress tick
+        self.pending_log_lines = deque(maxlen=MAX_LOG_LINES)
 
         # Configure text tags for different log levels
         self.log_text.tag_configure("INFO", foreground="#007bff")    # Blue
@@ -236,6 +248,30 @@ class VideoDownloaderApp:
         # Set up periodic progress check
         self.root.after(100, self.check_progress)
         self.info_fetched = False  # Track whether video info is fetched
+        # (URL this window submitted, manager handle) of every download it owns, including
+        # resumed ones; a shared job may know the submission by another URL
+        self.jobs = []
+
+        # Heavy modules (yt-dlp, requests, PIL) load in the background once the window is on screen
+        self._preloaded = False
+        self.root.bind("<Map>", self.on_first_map, add="+")
+
+        # Pick up downloads a previous session left unfinished
+        resumed = self.download_manager.resume_interrupted_jobs()
+        self.jobs = [(job.url, job) for job in resumed]
+        if resumed:
+            self.download_button.config(state="disabled")
+            self.cancel_button.config(state="normal")
+            self.log_message(f"Resuming {len(resumed)} interrupted download(s)", "INFO")
+
+    def on_first_map(self, event):
+        """Start preloading heavy modules the first time the main window is mapped"""
+        if self._preloaded or event.widget is not self.root:
+            return
+        self._preloaded = True
+        start_background_preload()
+        threading.Thread(target=self.thumbnail_service.preload, daemon=True).start()
+        threading.Thread(target=self.download_manager.library.rescan, daemon=True).start()
 
     def browse_directory(self):
         """Open directory browser dialog"""
@@ -274,9 +310,9 @@ class VideoDownloaderApp:
         minutes = minutes % 60
         return f"{hours}h {minutes}m {seconds}s"
 
-    def update_progress_display(self, progress_info: dict):
+    def update_progress_display(self, progress_info: ProgressInfo):
         """Update the progress display with download information"""
-        status = progress_info.get('status', '')
+        status = progress_info.status
 
         if status == 'downloading':
             # If it's actually downloading, enable the Cancel button (if disabled).
@@ -284,31 +320,54 @@ class VideoDownloaderApp:
             self.cancel_button.config(state="normal")
 
             # Update progress bar and labels
-            self.progress_var.set(progress_info.get('percentage', 0))
-            downloaded = self.format_size(progress_info.get('downloaded_bytes', 0))
-            total = self.format_size(progress_info.get('total_bytes', 0))
-            speed = self.format_speed(progress_info.get('speed', 0))
+            self.progress_var.set(progress_info.percentage)
+            downloaded = self.format_size(progress_info.downloaded_bytes)
+            total = self.format_size(progress_info.total_bytes)
+            speed = self.format_speed(progress_info.speed)
             
-            eta_seconds = progress_info.get('eta', None)
+            eta_seconds = progress_info.eta
             if eta_seconds is None:
                 eta_str = "N/A"
             else:
                 eta_str = self.format_time(eta_seconds)
             
+            item = ""
+            extra = progress_info.extra or {}
+            if 'playlist_index' in extra:
+                item = (f"Item {extra['playlist_index']} "
+                        f"({extra.get('items_completed', 0)} done) • ")
             self.progress_label.config(
-            text=f"Downloaded: {downloaded} / {total} ({progress_info.get('percentage', 0):.1f}%)"
+            text=f"{item}Downloaded: {downloaded} / {total} ({progress_info.percentage:.1f}%)"
             )
             self.speed_label.config(text=f"Speed: {speed} • ETA: {eta_str}")
+        elif status == 'waiting_for_space':
+            self.progress_label.config(text="Waiting for free disk space...")
+            self.speed_label.config(text="")
+        elif status == 'retrying':
+            extra = progress_info.extra or {}
+            self.progress_label.config(
+                text=f"Attempt {extra.get('attempt')} failed, retrying in {extra.get('retry_in', 0):.0f} s..."
+            )
+            self.speed_label.config(text=extra.get('error', ''))
+        elif status == 'circuit_open':
+            extra = progress_info.extra or {}
+            self.progress_label.config(text=f"{extra.get('host')} is throttling downloads, waiting...")
+            self.speed_label.config(text="")
+        elif status in ('merging', 'transcoding'):
+            self.progress_label.config(text="Downloaded, merging..." if status == 'merging' else "Downloaded, converting...")
+            self.speed_label.config(text="")
 
     def handle_download_complete(self, result: dict):
         """Handle download completion"""
         self.progress_var.set(100)
         self.progress_label.config(text="Download Complete!")
         self.speed_label.config(text="")
-        self.download_button.config(state="normal")
-        self.cancel_button.config(state="disabled")
-        self.log_message("Download completed successfully!", "SUCCESS")
-        self.log_message(f"File saved to: {result['filepath']}", "SUCCESS")
+        self.update_buttons()
+        if result.get('skipped'):
+            self.log_message(f"Already downloaded: {result['filepath']}", "SUCCESS")
+        else:
+            self.log_message("Download completed successfully!", "SUCCESS")
+            self.log_message(f"File saved to: {result['filepath']}", "SUCCESS")
         self.info_fetched = False  # Reset info fetched flag
 
     def handle_download_error(self, error: str):
@@ -316,8 +375,7 @@ class VideoDownloaderApp:
         self.progress_var.set(0)
         self.progress_label.config(text="")
         self.speed_label.config(text="")
-        self.download_button.config(state="normal")
-        self.cancel_button.config(state="disabled")
+        self.update_buttons()
         self.log_message(f"Error during download: {error}", "ERROR")
         self.info_fetched = False  # Reset info fetched flagc
 
@@ -326,16 +384,30 @@ class VideoDownloaderApp:
         self.download_manager.process_progress_updates(
             self.update_progress_display,
             self.handle_download_complete,
-            self.handle_download_error
+            self.handle_download_error,
+            self.handle_download_cancelled
         )
+        self.flush_log()
         self.root.after(100, self.check_progress)
 
     def log_message(self, message, level="INFO"):
-        self.log_text.configure(state="normal")
+        """Queue a line for the log view; lines are written to the widget in batches"""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_prefix = f"{timestamp} [{level}] "
-        self.log_text.insert("end", log_prefix, level)
-        self.log_text.insert("end", f"{message}\n")
+        self.pending_log_lines.append((f"{timestamp} [{level}] ", level, f"{message}\n"))
+
+    def flush_log(self):
+        """Write pending log lines to the widget and drop the oldest beyond MAX_LOG_LINES"""
+        if not self.pending_log_lines:
+            return
+        self.log_text.configure(state="normal")
+        while self.pending_log_lines:
+            log_prefix, level, line = self.pending_log_lines.popleft()
+            self.log_text.insert("end", log_prefix, level)
+            self.log_text.insert("end", line)
+        # The widget ends with an empty line after the last newline
+        excess = int(self.log_text.index("end-1c").split(".")[0]) - 1 - MAX_LOG_LINES
+        if excess > 0:
+            self.log_text.delete("1.0", f"{excess + 1}.0")
         self.log_text.configure(state="disabled")
         self.log_text.see("end")
 
@@ -349,55 +421,67 @@ class VideoDownloaderApp:
             self.log_message("Please enter a YouTube URL.", "ERROR")
             return
 
-        # Start a new thread to fetch video information
-        threading.Thread(target=self.fetch_video_info_thread, args=(url,)).start()
+        # Runs on the metadata service's loop; repeated clicks share one extraction
+        future = metadata_service.run(self.load_video_info(url))
+        future.add_done_callback(self.handle_video_info)
 
-    def fetch_video_info_thread(self, url):
-        try:
-            with yt_dlp.YoutubeDL() as ydl:
-                info = ydl.extract_info(url, download=False)
-            
-            title = info.get('title', 'N/A')
-            duration = info.get('duration', 0)
-            thumbnail_url = info.get('thumbnail', '')
-            uploader = info.get('uploader', 'N/A')
-            upload_date = info.get('upload_date', 'N/A')
-            view_count = info.get('view_count', 0)
-
-            # Format the upload date
-            upload_date = f"{upload_date[:4]}-{upload_date[4:6]}-{upload_date[6:]}" if upload_date != 'N/A' else 'N/A'
-            
-            self.video_title_label.config(text=f"Title: {title}")
-            self.video_duration_label.config(text=f"Duration: {duration // 60}:{duration % 60:02d}")
-            self.video_uploader_label.config(text=f"Uploader: {uploader}")
-            self.video_upload_date_label.config(text=f"Upload Date: {upload_date}")
-            self.video_view_count_label.config(text=f"Views: {view_count}")
-            
-            if thumbnail_url:
-                response = requests.get(thumbnail_url)
-                image_data = response.content
-                image = Image.open(io.BytesIO(image_data))
-                image = image.resize((160, 90), Image.LANCZOS)
-                
-                # Create a mask for rounded corners with a lower radius
-                mask = Image.new("L", image.size, 0)
-                draw = ImageDraw.Draw(mask)
-                radius = 5  # Lower radius value for slight roundness
-                draw.rounded_rectangle([(0, 0), image.size], radius, fill=255)
-                
-                # Apply the mask to the image
-                rounded_image = Image.new("RGBA", image.size)
-                rounded_image.paste(image, (0, 0), mask)
-                
-                photo = ImageTk.PhotoImage(rounded_image)
-                self.thumbnail_label.config(image=photo)
-                self.thumbnail_label.image = photo
-            
-            self.log_message("Video information fetched successfully.")
-            self.info_fetched = True
+    async def load_video_info(self, url):
+        """Fetch the info and thumbnail for a URL; runs on the metadata service's loop"""
+        metadata = await metadata_service.fetch(url)
         
+        title = metadata.title or 'N/A'
+        duration = int(metadata.duration or 0)
+        thumbnail_url = metadata.thumbnail or ''
+        uploader = metadata.uploader or 'N/A'
+        upload_date = metadata.upload_date or 'N/A'
+        view_count = metadata.view_count or 0
+
+        # Format the upload date
+        upload_date = f"{upload_date[:4]}-{upload_date[4:6]}-{upload_date[6:]}" if upload_date != 'N/A' else 'N/A'
+        
+        # Thumbnail download and processing run on a worker thread, off the event loop
+        thumbnail = None
+        if thumbnail_url:
+            thumbnail = await asyncio.get_running_loop().run_in_executor(
+                None, self.thumbnail_service.get_thumbnail, metadata.id, thumbnail_url
+            )
+
+        fields = {
+            'title': title,
+            'duration': f"{duration // 60}:{duration % 60:02d}",
+            'uploader': uploader,
+            'upload_date': upload_date,
+            'view_count': view_count
+        }
+        return fields, thumbnail
+
+    def handle_video_info(self, future):
+        """Hand the fetched info over to the Tk main thread"""
+        try:
+            fields, thumbnail = future.result()
         except Exception as e:
-            self.log_message(f"Error fetching video information: {str(e)}", "ERROR")
+            error = str(e) or "timed out"
+            self.root.after(0, self.log_message, f"Error fetching video information: {error}", "ERROR")
+            return
+        # Tk widgets and PhotoImages must only be touched on the main thread
+        self.root.after(0, self.show_video_info, fields, thumbnail)
+
+    def show_video_info(self, fields: dict, thumbnail):
+        """Display fetched video information; runs on the Tk main thread"""
+        self.video_title_label.config(text=f"Title: {fields['title']}")
+        self.video_duration_label.config(text=f"Duration: {fields['duration']}")
+        self.video_uploader_label.config(text=f"Uploader: {fields['uploader']}")
+        self.video_upload_date_label.config(text=f"Upload Date: {fields['upload_date']}")
+        self.video_view_count_label.config(text=f"Views: {fields['view_count']}")
+
+        if thumbnail is not None:
+            from PIL import ImageTk
+            photo = ImageTk.PhotoImage(thumbnail)
+            self.thumbnail_label.config(image=photo)
+            self.thumbnail_label.image = photo
+
+        self.log_message("Video information fetched successfully.")
+        self.info_fetched = True
 
     def download_video(self):
         """Download video with selected format and quality"""
@@ -407,7 +491,8 @@ class VideoDownloaderApp:
             return
 
         # Automatically fetch info if it hasn't been fetched yet
-        if not self.info_fetched:
+        # (skipped for playlists, which resolve their entries lazily while downloading)
+        if not self.info_fetched and not is_playlist_url(url):
             self.fetch_video_info()
 
         output_dir = self.output_entry.get().strip()
@@ -427,21 +512,40 @@ class VideoDownloaderApp:
         self.progress_var.set(0)
 
         try:
-            downloader = VideoDownloader(output_dir, format, selected_quality)
-            self.download_manager.start_download(
+            downloader = create_downloader(url, output_dir, format, selected_quality)
+            job = self.download_manager.start_download(
                 downloader,
                 url,
                 self.update_progress_display,
                 self.handle_download_complete
             )
+            self.jobs.append((url, job))
         except Exception as e:
             self.handle_download_error(str(e))
 
+    def running_jobs(self):
+        """This window's downloads that have not finished, and that it has not left"""
+        self.jobs = [(url, job) for url, job in self.jobs if job.final_update is None and url in job.urls]
+        return self.jobs
+
+    def update_buttons(self):
+        """Allow a new download only once none of this window's downloads is still running"""
+        if self.running_jobs():
+            return
+        self.download_button.config(state="normal")
+        self.cancel_button.config(state="disabled")
+
     def cancel_download(self):
-        """Cancel the current download"""
+        """Request cancellation of this window's downloads without blocking the UI"""
         self.cancel_button.config(state="disabled")  # Disable immediately
-        self.download_manager.stop_all_downloads()
-        self.download_button.config(state="normal")  # Re-enable after stopping
+        for url, job in self.running_jobs():
+            self.download_manager.cancel_download(url, job)
+        self.progress_label.config(text="Cancelling...")
+        self.speed_label.config(text="")
+
+    def handle_download_cancelled(self, url: str):
+        """Handle the download manager's acknowledgement of a cancellation"""
+        self.update_buttons()
         self.progress_var.set(0)
         self.progress_label.config(text="Download Cancelled")
         self.speed_label.config(text="")
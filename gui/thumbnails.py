@@ -0,0 +1,127 @@
+import io
+import os
+import threading
+from typing import Optional, TYPE_CHECKING
+from utils.logger import logger
+from utils.paths import user_cache_dir
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+THUMBNAIL_SIZE = (160, 90)
+CORNER_RADIUS = 5  # Lower radius value for slight roundness
+
+
+class ThumbnailService:
+    """
+    Fetches video thumbnails over a pooled HTTP session and keeps the processed
+    (resized, rounded) images in an on-disk LRU cache keyed by video ID.
+    Methods run on worker threads; turning the image into a PhotoImage is left
+    to the Tk main thread. requests and PIL are only imported on first use.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_entries: int = 500):
+        """
+        :param cache_dir: Directory for processed thumbnails (defaults to the user cache).
+        :param max_entries: Maximum number of thumbnails kept on disk.
+        """
+        self.cache_dir = cache_dir or user_cache_dir("thumbnails")
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._session = None
+        self._mask = None
+
+    def preload(self) -> None:
+        """
+        Import requests and PIL and set up the session and mask. Safe to call from any thread.
+        """
+        with self._lock:
+            if self._session is not None:
+                return
+            import requests
+            from requests.adapters import HTTPAdapter
+            from PIL import Image, ImageDraw
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+
+            # The mask is the same for every thumbnail, so build it once
+            self._mask = Image.new("L", THUMBNAIL_SIZE, 0)
+            ImageDraw.Draw(self._mask).rounded_rectangle([(0, 0), THUMBNAIL_SIZE], CORNER_RADIUS, fill=255)
+            self._session = session
+
+    def _path(self, video_id: str) -> str:
+        return os.path.join(self.cache_dir, f"{video_id}.png")
+
+    def get_thumbnail(self, video_id: Optional[str], url: str) -> "Image.Image":
+        """
+        Return the processed thumbnail for a video, from cache when possible.
+        :param video_id: YouTube video ID used as the cache key (None disables caching).
+        :param url: Thumbnail URL, fetched only on a cache miss.
+        :return: A 160x90 RGBA image with rounded corners.
+        """
+        self.preload()
+        if video_id:
+            cached = self._load(video_id)
+            if cached is not None:
+                return cached
+
+        response = self._session.get(url, timeout=10)
+        response.raise_for_status()
+        image = self._process(response.content)
+
+        if video_id:
+            self._store(video_id, image)
+        return image
+
+    def _process(self, data: bytes) -> "Image.Image":
+        from PIL import Image
+        image = Image.open(io.BytesIO(data))
+        # For JPEGs, let the decoder downscale by a power of two while decoding
+        image.draft("RGB", THUMBNAIL_SIZE)
+        image = image.convert("RGB").resize(THUMBNAIL_SIZE, Image.LANCZOS)
+
+        rounded_image = Image.new("RGBA", THUMBNAIL_SIZE)
+        rounded_image.paste(image, (0, 0), self._mask)
+        return rounded_image
+
+    def _load(self, video_id: str) -> Optional["Image.Image"]:
+        from PIL import Image
+        path = self._path(video_id)
+        try:
+            with Image.open(path) as image:
+                image.load()
+                os.utime(path, None)  # Keep eviction least-recently-used
+                return image.copy()
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, video_id: str, image: "Image.Image") -> None:
+        path = self._path(video_id)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            image.save(tmp_path, format="PNG")
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not cache thumbnail for {video_id}: {str(e)}")
+            return
+        self._evict()
+
+    def _evict(self) -> None:
+        with self._lock:
+            try:
+                entries = [e for e in os.scandir(self.cache_dir) if e.name.endswith(".png")]
+            except OSError:
+                return
+            excess = len(entries) - self.max_entries
+            if excess <= 0:
+                return
+            entries.sort(key=lambda e: e.stat().st_mtime)
+            for entry in entries[:excess]:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
@@ -0,0 +1,35 @@
+import unittest
+import yt_dlp
+from yt_dlp.downloader.http import HttpFD
+from downloader.fragment_tuner import FragmentTuner, RetryCountingLogger
+
+
+class RetryCountingLoggerTest(unittest.TestCase):
+    def setUp(self):
+        self.logger = RetryCountingLogger()
+        self.ydl = yt_dlp.YoutubeDL({"logger": self.logger, "quiet": False}, auto_init=False)
+        self.downloader = HttpFD(self.ydl, self.ydl.params)
+
+    def test_counts_http_retries(self):
+        self.downloader.report_retry(Exception("HTTP Error 503: Service Unavailable"), 1, 10)
+        self.downloader.report_retry(Exception("HTTP Error 503: Service Unavailable"), 2, 10)
+        self.assertEqual(self.logger.retries, 2)
+
+    def test_counts_fragment_retries(self):
+        self.downloader.report_retry(Exception("timed out"), 1, 10, frag_index=3)
+        self.assertEqual(self.logger.retries, 1)
+
+    def test_ignores_other_output(self):
+        self.logger.debug("[download] Destination: video.mp4")
+        self.logger.debug("[debug] Retrying is mentioned here but this is not a retry")
+        self.assertEqual(self.logger.retries, 0)
+
+
+class FragmentTunerTest(unittest.TestCase):
+    def test_backs_off_when_retries_pile_up(self):
+        tuner = FragmentTuner(initial=8)
+        self.assertEqual(tuner.record(8, 10_000_000, 2.0, retries=5, fragments=20), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
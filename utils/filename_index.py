@@ -0,0 +1,86 @@
+import os
+import threading
+from typing import Dict, Set
+
+
+class DirectoryNameIndex:
+    """
+    In-memory index of the filenames in one directory, built from a single
+    os.scandir and updated as names are reserved, so concurrent downloads
+    never pick the same "available" filename.
+    """
+
+    def __init__(self, directory: str):
+        """
+        :param directory: Directory to index.
+        """
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._names: Set[str] = set()
+        # base + ext -> next counter worth trying, so long runs of duplicates are skipped
+        self._next_counter: Dict[str, int] = {}
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    self._names.add(os.path.normcase(entry.name))
+        except FileNotFoundError:
+            pass
+
+    def reserve(self, filename: str) -> str:
+        """
+        Atomically pick and reserve a unique filename, appending (1), (2), ... as needed.
+        :param filename: Desired filename.
+        :return: The reserved filename.
+        """
+        base, ext = os.path.splitext(filename)
+        with self._lock:
+            candidate = filename
+            counter = self._next_counter.get(filename, 1)
+            while not self._is_free(candidate):
+                candidate = f"{base}({counter}){ext}"
+                counter += 1
+            if candidate != filename:
+                self._next_counter[filename] = counter
+            self._names.add(os.path.normcase(candidate))
+            return candidate
+
+    def claim(self, filename: str) -> None:
+        """
+        Mark a filename as taken, e.g. one recorded by a job being resumed.
+        """
+        with self._lock:
+            self._names.add(os.path.normcase(filename))
+
+    def release(self, filename: str) -> None:
+        """
+        Give back a reserved filename whose download never produced a file.
+        """
+        with self._lock:
+            if not os.path.exists(os.path.join(self.directory, filename)):
+                self._names.discard(os.path.normcase(filename))
+                self._next_counter.clear()
+
+    def _is_free(self, filename: str) -> bool:
+        if os.path.normcase(filename) in self._names:
+            return False
+        # One stat per pick catches files created outside this process since the scan
+        if os.path.exists(os.path.join(self.directory, filename)):
+            self._names.add(os.path.normcase(filename))
+            return False
+        return True
+
+
+_indexes: Dict[str, DirectoryNameIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_name_index(directory: str) -> DirectoryNameIndex:
+    """
+    Return the index shared by every download into a directory.
+    """
+    key = os.path.normcase(os.path.realpath(directory))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = DirectoryNameIndex(directory)
+        return index
@@ -1,12 +1,36 @@
+import atexit
 import logging
+import logging.handlers
+import queue
+
+LOG_FILE = "app.log"
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 3
+
+_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+
+_file_handler = logging.handlers.RotatingFileHandler(
+    LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+)
+_file_handler.setFormatter(_formatter)
+_stream_handler = logging.StreamHandler()
+_stream_handler.setFormatter(_formatter)
+
+# Threads only enqueue records; a single listener thread does the disk and console I/O
+_log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue()
+_listener = logging.handlers.QueueListener(
+    _log_queue, _file_handler, _stream_handler, respect_handler_level=True
+)
+_listener.start()
+atexit.register(_listener.stop)
+
+_queue_handler = logging.handlers.QueueHandler(_log_queue)
+# QueueHandler pre-formats the message; keep it bare so the listener's formatter adds the prefix once
+_queue_handler.setFormatter(logging.Formatter("%(message)s"))
 
 logging.basicConfig(
     level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("app.log"),
-        logging.StreamHandler()
-    ]
+    handlers=[_queue_handler]
 )
 
 logger = logging.getLogger(__name__)
@@ -0,0 +1,21 @@
+import os
+
+
+def user_cache_dir(*parts: str) -> str:
+    """
+    Returns a per-user cache directory for the application (not created).
+    :param parts: Sub-directories below the application's cache directory.
+    :return: The directory path.
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "youtube-downloader", *parts)
+
+
+def user_data_dir(*parts: str) -> str:
+    """
+    Returns a per-user data directory for the application (not created).
+    :param parts: Sub-directories below the application's data directory.
+    :return: The directory path.
+    """
+    base = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base, "youtube-downloader", *parts)
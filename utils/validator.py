@@ -1,5 +1,6 @@
 import re
-import os
+from typing import NamedTuple, Optional
+from urllib.parse import urlsplit
 
 def sanitize_filename(filename: str) -> str:
     """
@@ -12,19 +13,131 @@ def sanitize_filename(filename: str) -> str:
     return sanitized.strip()
 
 
-def get_available_filename(directory: str, filename: str) -> str:
+# Kinds of YouTubeRef
+REF_VIDEO = "video"
+REF_PLAYLIST = "playlist"
+
+
+class YouTubeRef(NamedTuple):
+    """
+    What a YouTube URL points at, reduced to its canonical ID.
+    """
+    kind: str  # REF_VIDEO or REF_PLAYLIST
+    id: str
+
+    @property
+    def key(self) -> str:
+        """
+        Identifies the content regardless of how its URL was written, e.g. "video:dQw4w9WgXcQ".
+        """
+        return f"{self.kind}:{self.id}"
+
+    @property
+    def url(self) -> str:
+        if self.kind == REF_PLAYLIST:
+            return f"https://www.youtube.com/playlist?list={self.id}"
+        return f"https://www.youtube.com/watch?v={self.id}"
+
+
+_VIDEO_ID = re.compile(r'[0-9A-Za-z_-]{11}\Z')
+_PLAYLIST_ID = re.compile(r'[0-9A-Za-z_-]{2,64}\Z')
+_YOUTUBE_HOSTS = frozenset({
+    "youtube.com", "www.youtube.com", "m.youtube.com", "music.youtube.com",
+    "youtube-nocookie.com", "www.youtube-nocookie.com",
+})
+_SHORT_HOSTS = frozenset({"youtu.be", "www.youtu.be"})
+# Path prefixes followed by a video ID, e.g. /shorts/<id>
+_VIDEO_PATHS = frozenset({"shorts", "embed", "live", "v", "e"})
+
+
+def _query_value(query: str, name: str) -> Optional[str]:
+    # Cheaper than parse_qs for the one parameter we need
+    for pair in query.split("&"):
+        key, _, value = pair.partition("=")
+        if key == name:
+            return value
+    return None
+
+
+def parse_youtube_url(url: str) -> Optional[YouTubeRef]:
+    """
+    Reduces any supported form of YouTube URL to a canonical video or playlist ID
+    without network access: youtu.be/<id>, watch?v=<id> (with any other parameters,
+    on www., m. or music.), /shorts/, /embed/, /live/ and playlist?list=<id>.
+    A watch URL that also names a playlist refers to the video.
+    :param url: The URL, with or without a scheme.
+    :return: The reference, or None if the URL is not a YouTube video or playlist.
+    """
+    url = url.strip()
+    if "://" not in url:
+        url = f"https://{url}"
+    try:
+        parts = urlsplit(url)
+        host = parts.hostname
+    except ValueError:
+        return None
+    if host in _SHORT_HOSTS:
+        video_id = parts.path[1:].split("/", 1)[0]
+        return YouTubeRef(REF_VIDEO, video_id) if _VIDEO_ID.match(video_id) else None
+    if host not in _YOUTUBE_HOSTS:
+        return None
+    segments = parts.path.strip("/").split("/")
+    if segments[0] == "watch":
+        video_id = _query_value(parts.query, "v")
+    elif segments[0] in _VIDEO_PATHS and len(segments) > 1:
+        video_id = segments[1]
+    elif segments[0] == "playlist":
+        playlist_id = _query_value(parts.query, "list")
+        if playlist_id and _PLAYLIST_ID.match(playlist_id):
+            return YouTubeRef(REF_PLAYLIST, playlist_id)
+        return None
+    else:
+        return None
+    return YouTubeRef(REF_VIDEO, video_id) if video_id and _VIDEO_ID.match(video_id) else None
+
+
+def extract_video_id(url: str) -> Optional[str]:
+    """
+    Extracts the 11-character YouTube video ID from a URL without any network access.
+    :param url: The URL of the YouTube video.
+    :return: The video ID, or None if the URL does not point at a single video.
+    """
+    ref = parse_youtube_url(url)
+    return ref.id if ref is not None and ref.kind == REF_VIDEO else None
+
+
+def is_playlist_url(url: str) -> bool:
+    """
+    Checks whether a URL points at a whole YouTube playlist rather than a single video.
+    :param url: The URL to check.
+    :return: True for playlist URLs, False otherwise.
     """
-    Ensures the filename is unique by appending a number if needed.
-    :param directory: Directory where the file will be saved.
-    :param filename: Desired filename.
-    :return: A unique filename.
+    ref = parse_youtube_url(url)
+    return ref is not None and ref.kind == REF_PLAYLIST
+
+
+_CHANNEL_PATTERN = re.compile(
+    r'(https?://(?:www\.|m\.)?youtube\.com/(?:@[\w.-]+|channel/UC[\w-]{22}|c/[^/?#]+|user/[^/?#]+))(/[a-z]+)?/?(?:[?#].*)?$'
+)
+
+
+def is_channel_url(url: str) -> bool:
     """
-    base, ext = os.path.splitext(filename)
-    counter = 1
-    unique_filename = filename
+    Checks whether a URL points at a YouTube channel (handle, channel ID, custom or user URL).
+    :param url: The URL to check.
+    :return: True for channel URLs, False otherwise.
+    """
+    return _CHANNEL_PATTERN.match(url.strip()) is not None
 
-    while os.path.exists(os.path.join(directory, unique_filename)):
-        unique_filename = f"{base}({counter}){ext}"
-        counter += 1
 
-    return unique_filename
+def channel_videos_url(url: str) -> str:
+    """
+    Returns the URL of a channel's uploads tab, which lists videos newest first.
+    :param url: A channel URL, with or without a tab.
+    :return: The channel's /videos URL, or its /shorts or /streams tab if one was given.
+    """
+    match = _CHANNEL_PATTERN.match(url.strip())
+    if not match:
+        raise ValueError(f"Not a YouTube channel URL: {url}")
+    tab = match.group(2) if match.group(2) in ("/videos", "/shorts", "/streams") else "/videos"
+    return f"{match.group(1)}{tab}"